@@ -0,0 +1,152 @@
+import argparse
+import random
+import time
+import tracemalloc
+from threading import Barrier, Lock, Thread
+from concurrent_hashmap import ConcurrentHashmap
+from hashmap import ChainingStorage, Hashmap, StorageType
+
+class GlobalLockHashmap:
+  # Baseline: one lock around a plain Hashmap
+  def __init__(self):
+    self.map = Hashmap(capacity = 16)
+    self.lock = Lock()
+
+  def get(self, key):
+    with self.lock:
+      return self.map.get(key)
+
+  def put(self, key, value):
+    with self.lock:
+      self.map.put(key, value)
+
+def _runThreads(target, threads, ops, read_ratio, key_space):
+  barrier = Barrier(threads + 1)
+
+  def work(seed):
+    rng = random.Random(seed)
+    plan = [(rng.random() < read_ratio, rng.randrange(key_space)) for _ in range(ops)]
+    get, put = target.get, target.put
+    barrier.wait()
+    for is_read, key in plan:
+      if is_read:
+        get(key)
+      else:
+        put(key, key)
+
+  workers = [Thread(target = work, args = (seed,)) for seed in range(threads)]
+  for worker in workers:
+    worker.start()
+  barrier.wait()
+  start = time.perf_counter()
+  for worker in workers:
+    worker.join()
+  return threads * ops / (time.perf_counter() - start)
+
+def concurrentBenchmark(args):
+  print(f"{'map':<12}{'threads':>8}{'reads':>8}{'ops/sec':>14}")
+  for read_ratio in args.read_ratios:
+    for threads in args.threads:
+      for name, factory in (("global-lock", GlobalLockHashmap), ("striped", lambda: ConcurrentHashmap(args.segments))):
+        target = factory()
+        for key in range(args.key_space):
+          target.put(key, key)
+        throughput = _runThreads(target, threads, args.ops, read_ratio, args.key_space)
+        print(f"{name:<12}{threads:>8}{read_ratio:>8.0%}{throughput:>14,.0f}")
+
+class DictHashNode:
+  # HashNode and Bucket as they were before __slots__: every instance carries a __dict__
+  def __init__(self, key, value):
+    self.key = key
+    self.value = value
+
+class DictBucket:
+  def __init__(self):
+    self.head = None
+
+  def insert(self, key, value):
+    node = self.head
+    while node:
+      if node.key == key:
+        node.value = value
+        return False
+      node = node.next
+    new_node = DictHashNode(key, value)
+    new_node.next = self.head
+    self.head = new_node
+    return True
+
+  def find(self, key):
+    node = self.head
+    while node:
+      if node.key == key:
+        return node
+      node = node.next
+    return None
+
+  def delete(self, key):
+    prev, node = None, self.head
+    while node:
+      if node.key == key:
+        if prev:
+          prev.next = node.next
+        else:
+          self.head = node.next
+        return True
+      prev = node
+      node = node.next
+    return False
+
+class DictChainingStorage(ChainingStorage):
+  def __init__(self, capacity):
+    self.capacity = capacity
+    self.occupied = 0
+    self.buckets = [DictBucket() for _ in range(capacity)]
+
+class DictChainingHashmap(Hashmap):
+  # The "before" row of the memory benchmark: chaining with __dict__ nodes and buckets
+  def _newTable(self, capacity):
+    return DictChainingStorage(capacity)
+
+def memoryBenchmark(args):
+  # Keys are allocated before tracing starts and reused as values, so the numbers are
+  # the table's own overhead per entry: slot arrays, nodes and buckets
+  print(f"{'storage':<18}{'entries':>12}{'bytes/entry':>14}{'build secs':>12}")
+  engines = [("chaining (dict)", DictChainingHashmap)] if args.baseline else []
+  engines += [(storage.value, lambda storage = storage: Hashmap(storage = storage)) for storage in args.storages]
+  for size in args.sizes:
+    keys = list(range(1 << 40, (1 << 40) + size))
+    for name, factory in engines:
+      tracemalloc.start()
+      before = tracemalloc.get_traced_memory()[0]
+      start = time.perf_counter()
+      hm = factory()
+      for key in keys:
+        hm.put(key, key)
+      elapsed = time.perf_counter() - start
+      used = tracemalloc.get_traced_memory()[0] - before
+      tracemalloc.stop()
+      print(f"{name:<18}{size:>12,}{used / size:>14.1f}{elapsed:>12.1f}")
+      del hm
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description = "Hashmap benchmarks")
+  commands = parser.add_subparsers(dest = "command", required = True)
+
+  concurrent = commands.add_parser("concurrent", help = "ConcurrentHashmap vs one global lock")
+  concurrent.add_argument("--threads", type = int, nargs = "+", default = [1, 2, 4, 8])
+  concurrent.add_argument("--read-ratios", type = float, nargs = "+", default = [0.5, 0.9, 0.99])
+  concurrent.add_argument("--ops", type = int, default = 100_000, help = "operations per thread")
+  concurrent.add_argument("--key-space", type = int, default = 100_000)
+  concurrent.add_argument("--segments", type = int, default = 16)
+  concurrent.set_defaults(run = concurrentBenchmark)
+
+  memory = commands.add_parser("memory", help = "tracemalloc bytes per entry for each storage engine")
+  memory.add_argument("--sizes", type = int, nargs = "+", default = [1_000_000, 10_000_000])
+  memory.add_argument("--storages", type = StorageType, nargs = "+", default = list(StorageType))
+  memory.add_argument("--no-baseline", dest = "baseline", action = "store_false",
+                      help = "skip chaining with the pre-__slots__ node and bucket classes")
+  memory.set_defaults(run = memoryBenchmark)
+
+  args = parser.parse_args()
+  args.run(args)
@@ -0,0 +1,114 @@
+from threading import Lock
+from hashmap import Hashmap, StorageType
+
+_MISSING = object()
+_GOLDEN = 0x9E3779B97F4A7C15
+_MASK_64 = (1 << 64) - 1
+
+class ConcurrentHashmap:
+  # Lock striping: keys are spread over independent Hashmap segments, each guarded by
+  # its own lock. Writers only serialize within a segment and a segment resizes alone.
+  def __init__(self, segments = 16, capacity = 16, threshold = 0.75, hash_function = None,
+               storage = StorageType.CHAINING, incremental = False):
+    self.segment_count = segments
+    self.segments = [
+      Hashmap(capacity, threshold, hash_function, storage, incremental = incremental)
+      for _ in range(segments)
+    ]
+    self.locks = [Lock() for _ in range(segments)]
+
+  def _segmentIndex(self, key):
+    # Use the high bits of a mixed hash so the segment choice doesn't correlate with
+    # the bucket index the segment's own hash function picks from the low bits
+    return (((hash(key) * _GOLDEN) & _MASK_64) >> 32) % self.segment_count
+
+  def get(self, key, default = None):
+    # Lock-free read: single list/attribute reads are atomic under the GIL and writers
+    # publish entries before linking them. A miss that overlapped a resize of the
+    # segment is confirmed again under the lock: one was running before the lookup, or
+    # one started or ran since (table read before old_table, as a resize sets them the
+    # other way round).
+    i = self._segmentIndex(key)
+    segment = self.segments[i]
+    table = segment.table
+    resizing = segment.old_table is not None
+    value = segment._lookup(key, _MISSING)
+    if value is _MISSING and (resizing or segment.table is not table or segment.old_table is not None):
+      with self.locks[i]:
+        value = segment._lookup(key, _MISSING)
+    return default if value is _MISSING else value
+
+  def containsKey(self, key):
+    return self.get(key, _MISSING) is not _MISSING
+
+  def put(self, key, value):
+    i = self._segmentIndex(key)
+    with self.locks[i]:
+      self.segments[i].put(key, value)
+
+  def remove(self, key):
+    i = self._segmentIndex(key)
+    with self.locks[i]:
+      self.segments[i].remove(key)
+
+  def put_if_absent(self, key, value):
+    # Returns the existing value, or None if value was inserted
+    i = self._segmentIndex(key)
+    segment = self.segments[i]
+    with self.locks[i]:
+      current = segment._lookup(key, _MISSING)
+      if current is not _MISSING:
+        return current
+      segment.put(key, value)
+      return None
+
+  def compute(self, key, remapping):
+    # remapping(key, current or None) -> new value; returning None removes the key
+    i = self._segmentIndex(key)
+    segment = self.segments[i]
+    with self.locks[i]:
+      current = segment._lookup(key, _MISSING)
+      value = remapping(key, None if current is _MISSING else current)
+      if value is None:
+        if current is not _MISSING:
+          segment.remove(key)
+      else:
+        segment.put(key, value)
+      return value
+
+  def merge(self, key, value, remapping):
+    # Stores value if the key is absent, else remapping(current, value); None removes the key
+    i = self._segmentIndex(key)
+    segment = self.segments[i]
+    with self.locks[i]:
+      current = segment._lookup(key, _MISSING)
+      if current is _MISSING:
+        segment.put(key, value)
+        return value
+      value = remapping(current, value)
+      if value is None:
+        segment.remove(key)
+      else:
+        segment.put(key, value)
+      return value
+
+  def __len__(self):
+    return sum(segment.size for segment in self.segments)
+
+if __name__ == "__main__":
+  from threading import Thread
+
+  chm = ConcurrentHashmap(segments = 4)
+  workers = [
+    Thread(target = lambda: [chm.merge(word, 1, lambda a, b: a + b) for word in ["apple", "banana", "apple"] * 1000])
+    for _ in range(8)
+  ]
+  for worker in workers:
+    worker.start()
+  for worker in workers:
+    worker.join()
+
+  print(chm.get("apple"), chm.get("banana"), len(chm))
+  print(chm.put_if_absent("apple", 0), chm.put_if_absent("cherry", 5))
+  print(chm.compute("cherry", lambda key, value: value * 2), chm.compute("banana", lambda key, value: None))
+  print(chm.get("cherry"), chm.containsKey("banana"), len(chm))
@@ -1,20 +1,185 @@
+import numbers
+import os
 from abc import ABC, abstractmethod
+from array import array
+from collections import Counter
+from enum import Enum
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
 
 class IHashFunction(ABC):
+  # True when hashMany has a NumPy path for integer arrays, so batches of int keys are
+  # worth converting to one
+  vectorized = False
+
   @abstractmethod
   def hash(self, key, capacity):
     pass
 
+  def hashMany(self, keys, capacity):
+    if _isIntArray(keys):
+      keys = keys.tolist()
+    return [self.hash(key, capacity) for key in keys]
+
+def _isIntArray(keys):
+  return np is not None and isinstance(keys, np.ndarray) and keys.dtype.kind in "iu"
+
+def _intArrayHashes(keys):
+  # Vectorized hash() for integer arrays: hash(n) == n for |n| < 2**61 - 1, except hash(-1) == -2.
+  # Returns None when the batch can't take the vectorized path.
+  # Range check on min/max rather than abs(), which wraps around for the int64 minimum
+  if not _isIntArray(keys) or not len(keys) or int(keys.max()) >= (1 << 61) - 1 or int(keys.min()) <= -(1 << 61) + 1:
+    return None
+  return np.where(keys == -1, -2, keys).astype(np.int64)
+
+def _keyBytes(key):
+  if isinstance(key, str):
+    return key.encode("utf-8", "surrogatepass")
+  if isinstance(key, (bytes, bytearray, memoryview)):
+    return bytes(key)
+  # Integers are encoded from their own value, never hash(), which is unsalted and taken
+  # mod 2**61 - 1. Equal keys must agree, so bools and integral floats take the int form.
+  if isinstance(key, float) and key.is_integer():
+    key = int(key)
+  if isinstance(key, numbers.Integral):
+    key = int(key)
+    return key.to_bytes(key.bit_length() // 8 + 1, "little", signed = True)
+  # Anything else (tuples, other floats, ...) goes through hash() and isn't flooding resistant
+  return hash(key).to_bytes(8, "little", signed = True)
+
+_MASK_32 = (1 << 32) - 1
+_MASK_64 = (1 << 64) - 1
+
 class DefaultHashFunction(IHashFunction):
+  vectorized = True
+
   def hash(self, key, capacity):
     return hash(key) % capacity
-  
+
+  def hashMany(self, keys, capacity):
+    hashes = _intArrayHashes(keys)
+    if hashes is not None:
+      return (hashes % capacity).tolist()
+    return [hash(key) % capacity for key in keys]
+
+class FibonacciHashFunction(IHashFunction):
+  # Multiplicative hashing: multiply by 2**64 / phi and keep the top bits. Every input
+  # bit reaches the index, so keys differing only in high bits still spread out.
+  # Capacity must be a power of two; the index is a shift instead of a modulo.
+  GOLDEN = 0x9E3779B97F4A7C15
+  vectorized = True
+
+  def _shift(self, capacity):
+    if capacity & (capacity - 1):
+      raise ValueError(f"FibonacciHashFunction needs a power of two capacity, got {capacity}")
+    return 64 - (capacity.bit_length() - 1)
+
+  def hash(self, key, capacity):
+    return ((hash(key) * self.GOLDEN) & _MASK_64) >> self._shift(capacity) if capacity > 1 else 0
+
+  def hashMany(self, keys, capacity):
+    hashes = _intArrayHashes(keys)
+    if hashes is None or capacity == 1:
+      return super().hashMany(keys, capacity)
+    # uint64 multiplication wraps around, which is exactly the & _MASK_64 above
+    product = hashes.astype(np.uint64) * np.uint64(self.GOLDEN)
+    return (product >> np.uint64(self._shift(capacity))).tolist()
+
+def _rotl64(x, b):
+  return ((x << b) | (x >> (64 - b))) & _MASK_64
+
+def siphash24(k0, k1, data):
+  v0 = k0 ^ 0x736F6D6570736575
+  v1 = k1 ^ 0x646F72616E646F6D
+  v2 = k0 ^ 0x6C7967656E657261
+  v3 = k1 ^ 0x7465646279746573
+
+  def rounds(n):
+    nonlocal v0, v1, v2, v3
+    for _ in range(n):
+      v0 = (v0 + v1) & _MASK_64; v1 = _rotl64(v1, 13) ^ v0; v0 = _rotl64(v0, 32)
+      v2 = (v2 + v3) & _MASK_64; v3 = _rotl64(v3, 16) ^ v2
+      v0 = (v0 + v3) & _MASK_64; v3 = _rotl64(v3, 21) ^ v0
+      v2 = (v2 + v1) & _MASK_64; v1 = _rotl64(v1, 17) ^ v2; v2 = _rotl64(v2, 32)
+
+  tail_start = len(data) - len(data) % 8
+  for i in range(0, tail_start, 8):
+    m = int.from_bytes(data[i:i + 8], "little")
+    v3 ^= m
+    rounds(2)
+    v0 ^= m
+  m = ((len(data) & 0xFF) << 56) | int.from_bytes(data[tail_start:], "little")
+  v3 ^= m
+  rounds(2)
+  v0 ^= m
+  v2 ^= 0xFF
+  rounds(4)
+  return v0 ^ v1 ^ v2 ^ v3
+
+class SipHashFunction(IHashFunction):
+  # SipHash-2-4 keyed with a secret 128-bit seed: without the seed an attacker can't
+  # precompute keys that all land in one bucket (hash flooding)
+  def __init__(self, seed: bytes = None):
+    seed = seed if seed is not None else os.urandom(16)
+    if len(seed) != 16:
+      raise ValueError("SipHash seed must be 16 bytes")
+    self.k0 = int.from_bytes(seed[:8], "little")
+    self.k1 = int.from_bytes(seed[8:], "little")
+
+  def hash(self, key, capacity):
+    return siphash24(self.k0, self.k1, _keyBytes(key)) % capacity
+
+def _rotl32(x, b):
+  return ((x << b) | (x >> (32 - b))) & _MASK_32
+
+_XXH_P1, _XXH_P2, _XXH_P3, _XXH_P4, _XXH_P5 = 2654435761, 2246822519, 3266489917, 668265263, 374761393
+
+def xxh32(data, seed = 0):
+  n, i = len(data), 0
+  if n >= 16:
+    lanes = [(seed + _XXH_P1 + _XXH_P2) & _MASK_32, (seed + _XXH_P2) & _MASK_32, seed & _MASK_32, (seed - _XXH_P1) & _MASK_32]
+    while i + 16 <= n:
+      for lane in range(4):
+        word = int.from_bytes(data[i:i + 4], "little")
+        lanes[lane] = (_rotl32((lanes[lane] + word * _XXH_P2) & _MASK_32, 13) * _XXH_P1) & _MASK_32
+        i += 4
+    h = (_rotl32(lanes[0], 1) + _rotl32(lanes[1], 7) + _rotl32(lanes[2], 12) + _rotl32(lanes[3], 18)) & _MASK_32
+  else:
+    h = (seed + _XXH_P5) & _MASK_32
+  h = (h + n) & _MASK_32
+  while i + 4 <= n:
+    h = (_rotl32((h + int.from_bytes(data[i:i + 4], "little") * _XXH_P3) & _MASK_32, 17) * _XXH_P4) & _MASK_32
+    i += 4
+  while i < n:
+    h = (_rotl32((h + data[i] * _XXH_P5) & _MASK_32, 11) * _XXH_P1) & _MASK_32
+    i += 1
+  h = ((h ^ (h >> 15)) * _XXH_P2) & _MASK_32
+  h = ((h ^ (h >> 13)) * _XXH_P3) & _MASK_32
+  return h ^ (h >> 16)
+
+class XXHashFunction(IHashFunction):
+  # XXH32 over the key bytes: deterministic across processes (unlike str hash()),
+  # fast on long str/bytes keys, but not keyed, so not flooding resistant
+  def __init__(self, seed = 0):
+    self.seed = seed
+
+  def hash(self, key, capacity):
+    return xxh32(_keyBytes(key), self.seed) % capacity
+
 class HashNode:
-  def __init__(self, key, value):
+  __slots__ = ("key", "value", "next")
+
+  def __init__(self, key, value, next = None):
     self.key = key
     self.value = value
-  
+    self.next = next
+
 class Bucket:
+  __slots__ = ("head",)
+
   def __init__(self):
     self.head = None
 
@@ -22,13 +187,12 @@ class Bucket:
     node = self.head
     while node:
       if node.key == key:
-        node.val = value
-        return
+        node.value = value
+        return False
       node = node.next
-    new_node = HashNode(key, value)
-    new_node.next = self.head
-    self.head = new_node
-  
+    self.head = HashNode(key, value, self.head)
+    return True
+
   def find(self, key):
     node = self.head
     while node:
@@ -36,7 +200,7 @@ class Bucket:
         return node
       node = node.next
     return None
-  
+
   def delete(self, key):
     prev, node = None, self.head
     while node:
@@ -49,72 +213,530 @@ class Bucket:
       prev = node
       node = node.next
     return False
-  
+
+
+# Storage engines
+class StorageType(Enum):
+  CHAINING = "chaining"
+  COMPACT_CHAINING = "compact_chaining"
+  OPEN_ADDRESSING = "open_addressing"
+
+class IStorage(ABC):
+  @abstractmethod
+  def insert(self, index, key, value):
+    pass
+
+  @abstractmethod
+  def find(self, index, key, default = None):
+    pass
+
+  @abstractmethod
+  def delete(self, index, key):
+    pass
+
+  @abstractmethod
+  def slotItems(self, index):
+    pass
+
+  @abstractmethod
+  def clearSlot(self, index):
+    pass
+
+  def items(self):
+    for index in range(self.capacity):
+      yield from self.slotItems(index)
+
+  def moveSlot(self, index, target, home):
+    # Moves every entry of slot index into target (home(key) gives its index there).
+    # Inserts into target before clearing the slot, so lock-free readers checking the
+    # old table first never miss an entry in between.
+    items = self.slotItems(index)
+    for key, value in items:
+      target.insert(home(key), key, value)
+    self.clearSlot(index)
+    return len(items)
+
+  def lengthHistogram(self, home):
+    # Chain length -> number of buckets (empty buckets included)
+    return Counter(len(self.slotItems(index)) for index in range(self.capacity))
+
+class ChainingStorage(IStorage):
+  def __init__(self, capacity):
+    self.capacity = capacity
+    self.occupied = 0
+    self.buckets = [Bucket() for _ in range(capacity)]
+
+  def insert(self, index, key, value):
+    inserted = self.buckets[index].insert(key, value)
+    if inserted:
+      self.occupied += 1
+    return inserted
+
+  def find(self, index, key, default = None):
+    node = self.buckets[index].find(key)
+    return node.value if node else default
+
+  def delete(self, index, key):
+    deleted = self.buckets[index].delete(key)
+    if deleted:
+      self.occupied -= 1
+    return deleted
+
+  def slotItems(self, index):
+    items = []
+    node = self.buckets[index].head
+    while node:
+      items.append((node.key, node.value))
+      node = node.next
+    return items
+
+  def clearSlot(self, index):
+    self.occupied -= len(self.slotItems(index))
+    self.buckets[index].head = None
+
+class CompactChainingStorage(IStorage):
+  # Same chains as ChainingStorage, but the slot array holds the head HashNode directly
+  # and None for an empty bucket, so there is no Bucket object per slot. Resizing
+  # relinks the existing nodes into the new table instead of allocating new ones.
+  def __init__(self, capacity):
+    self.capacity = capacity
+    self.occupied = 0
+    self.heads = [None] * capacity
+
+  def insert(self, index, key, value):
+    node = self.heads[index]
+    while node:
+      if node.key == key:
+        node.value = value
+        return False
+      node = node.next
+    self.heads[index] = HashNode(key, value, self.heads[index])
+    self.occupied += 1
+    return True
+
+  def find(self, index, key, default = None):
+    node = self.heads[index]
+    while node:
+      if node.key == key:
+        return node.value
+      node = node.next
+    return default
+
+  def delete(self, index, key):
+    prev, node = None, self.heads[index]
+    while node:
+      if node.key == key:
+        if prev:
+          prev.next = node.next
+        else:
+          self.heads[index] = node.next
+        self.occupied -= 1
+        return True
+      prev, node = node, node.next
+    return False
+
+  def slotItems(self, index):
+    items = []
+    node = self.heads[index]
+    while node:
+      items.append((node.key, node.value))
+      node = node.next
+    return items
+
+  def clearSlot(self, index):
+    self.occupied -= len(self.slotItems(index))
+    self.heads[index] = None
+
+  def moveSlot(self, index, target, home):
+    if not isinstance(target, CompactChainingStorage):
+      return super().moveSlot(index, target, home)
+    # Keys are unique across both tables, so each node is pushed onto its new chain
+    # without a duplicate check. A lock-free reader walking this chain may be diverted
+    # into the new table; ConcurrentHashmap re-checks such misses under the lock.
+    moved, node = 0, self.heads[index]
+    target_heads = target.heads
+    while node:
+      following = node.next
+      new_index = home(node.key)
+      node.next = target_heads[new_index]
+      target_heads[new_index] = node
+      node = following
+      moved += 1
+    target.occupied += moved
+    self.occupied -= moved
+    self.heads[index] = None
+    return moved
+
+_EMPTY = object()
+_TOMBSTONE = object()
+
+class OpenAddressingStorage(IStorage):
+  # Linear probing over parallel flat arrays. Deleted slots become tombstones so
+  # later probes keep walking; they count towards occupancy until the next rebuild.
+  # Next to each key the slot keeps the key's home index (the index the hash function
+  # gave it) in an unboxed array('q'). A probe only compares keys whose home matches, so
+  # it never needs to hash the key a second time.
+  def __init__(self, capacity):
+    self.capacity = capacity
+    self.occupied = 0
+    self.keys = [_EMPTY] * capacity
+    self.values = [None] * capacity
+    self.homes = array("q", bytes(8 * capacity))
+
+  def _probe(self, index, key):
+    keys, homes, capacity = self.keys, self.homes, self.capacity
+    home, tombstone = index, -1
+    for _ in range(capacity):
+      slot_key = keys[index]
+      if slot_key is _EMPTY:
+        return -1, (tombstone if tombstone >= 0 else index)
+      if slot_key is _TOMBSTONE:
+        if tombstone < 0:
+          tombstone = index
+      elif homes[index] == home and (slot_key is key or slot_key == key):
+        return index, tombstone
+      index += 1
+      if index == capacity:
+        index = 0
+    return -1, tombstone
+
+  def insert(self, index, key, value):
+    found, free = self._probe(index, key)
+    if found >= 0:
+      self.values[found] = value
+      return False
+    if free < 0:
+      raise RuntimeError("open addressing table is full")
+    if self.keys[free] is _EMPTY:
+      self.occupied += 1
+    # The key goes in last: lock-free readers treat a slot as filled once it has one
+    self.values[free] = value
+    self.homes[free] = index
+    self.keys[free] = key
+    return True
+
+  def find(self, index, key, default = None):
+    # _probe inlined: find is the hot path and skips the tombstone bookkeeping. Most
+    # keys sit in their home slot, which is checked before setting up the walk.
+    keys = self.keys
+    slot_key = keys[index]
+    if slot_key is key:
+      return self.values[index]
+    if slot_key is _EMPTY:
+      return default
+    homes, capacity = self.homes, self.capacity
+    home = index
+    for _ in range(capacity):
+      slot_key = keys[index]
+      if slot_key is _EMPTY:
+        return default
+      if (slot_key is key or slot_key == key) and homes[index] == home and slot_key is not _TOMBSTONE:
+        return self.values[index]
+      index += 1
+      if index == capacity:
+        index = 0
+    return default
+
+  def delete(self, index, key):
+    found, _ = self._probe(index, key)
+    if found < 0:
+      return False
+    self.keys[found] = _TOMBSTONE
+    self.values[found] = None
+    return True
+
+  def slotItems(self, index):
+    key = self.keys[index]
+    if key is _EMPTY or key is _TOMBSTONE:
+      return []
+    return [(key, self.values[index])]
+
+  def lengthHistogram(self, home):
+    # Probe length -> number of entries: slots walked from the home index to find the key
+    histogram = Counter()
+    for index, key in enumerate(self.keys):
+      if key is not _EMPTY and key is not _TOMBSTONE:
+        histogram[(index - self.homes[index]) % self.capacity + 1] += 1
+    return histogram
+
+  def clearSlot(self, index):
+    if self.keys[index] is not _EMPTY:
+      self.keys[index] = _TOMBSTONE
+      self.values[index] = None
+
+_STORAGE_ENGINES = {
+  StorageType.CHAINING: ChainingStorage,
+  StorageType.COMPACT_CHAINING: CompactChainingStorage,
+  StorageType.OPEN_ADDRESSING: OpenAddressingStorage,
+}
+
+
 class Hashmap:
-  def __init__(self, capacity = 8, threshold = 0.75, hash_function = None):
+  def __init__(self, capacity = 8, threshold = 0.75, hash_function = None, storage = StorageType.CHAINING,
+               incremental = False, rehash_step = 4, shrink_threshold = None):
+    storage = StorageType(storage)
+    if storage == StorageType.OPEN_ADDRESSING and not 0 < threshold < 1:
+      raise ValueError("open addressing needs a load factor threshold below 1")
+    if shrink_threshold is not None and not 0 <= shrink_threshold < threshold / 2:
+      raise ValueError("shrink threshold must be below half of the grow threshold")
     self.capacity = capacity
+    self.min_capacity = capacity
     self.threshold = threshold
+    self.shrink_threshold = shrink_threshold
     self.size = 0
-    self.buckets = [Bucket() for _ in range(self.capacity)]
+    self.storage = storage
+    self.table = self._newTable(self.capacity)
     self.hash_function = hash_function or DefaultHashFunction()
-  
+
+    # Incremental rehash state: while old_table is set, every operation migrates
+    # up to rehash_step buckets from old_table into table, starting at rehash_index
+    self.incremental = incremental
+    self.rehash_step = rehash_step
+    self.old_table = None
+    self.rehash_index = 0
+
+  def _newTable(self, capacity):
+    return _STORAGE_ENGINES[self.storage](capacity)
+
   def _getIndex(self, key):
     return self.hash_function.hash(key, self.capacity)
 
+  def isRehashing(self):
+    return self.old_table is not None
+
   def put(self, key, value):
+    if self.old_table:
+      self._rehashStep()
     index = self._getIndex(key)
-    if not self.buckets[index].find(key):
+    inserted = self.table.insert(index, key, value)
+    if self.old_table and self.old_table.delete(self.hash_function.hash(key, self.old_table.capacity), key):
+      inserted = False
+    if inserted:
       self.size += 1
-    self.buckets[index].insert(key, value)
 
-    if (self.size / self.capacity) > self.threshold:
-      self._resize()
+    if (self.table.occupied / self.capacity) > self.threshold:
+      self._resize(self._grownCapacity())
 
   def get(self, key):
-    index = self._getIndex(key)
-    return self.buckets[index].find(key)
+    if self.old_table:
+      self._rehashStep()
+    return self._lookup(key)
+
+  def _lookup(self, key, default = None):
+    # Old table first: migration inserts into the new table before clearing the old slot
+    # Index with each table's own capacity: a lock-free reader may see a resize half done
+    old_table, table = self.old_table, self.table
+    if old_table:
+      value = old_table.find(self.hash_function.hash(key, old_table.capacity), key, _EMPTY)
+      if value is not _EMPTY:
+        return value
+    return table.find(self.hash_function.hash(key, table.capacity), key, default)
 
   def remove(self, key):
+    if self.old_table:
+      self._rehashStep()
     index = self._getIndex(key)
-    removed = self.buckets[index].delete(key)
+    removed = self.table.delete(index, key)
+    if not removed and self.old_table:
+      removed = self.old_table.delete(self.hash_function.hash(key, self.old_table.capacity), key)
     if removed:
       self.size -= 1
-  
-  def _resize(self):
-    print(f"Resizing from {self.capacity} to {self.capacity * 2}")
-    old_size = self.size
-    old_buckets = self.buckets
-    self.capacity *= 2
-    self.buckets = [Bucket() for _ in range(self.capacity)]
-    self.size = 0
 
-    for bucket in old_buckets:
-      node = self.head
-      while node:
-        self.put(node.key, node.value)
-        node = node.next
-    self.size = old_size
-  
+    if (self.shrink_threshold is not None and not self.old_table and self.capacity > self.min_capacity
+        and self.size / self.capacity < self.shrink_threshold):
+      self._resize(max(self.min_capacity, self.capacity // 2))
+
+  def bucketHistogram(self):
+    # Chaining: chain length -> bucket count. Open addressing: probe length -> entry count.
+    histogram = Counter()
+    for table in (self.old_table, self.table):
+      if table:
+        histogram += table.lengthHistogram(lambda key: self.hash_function.hash(key, table.capacity))
+    return dict(sorted(histogram.items()))
+
+  # Persistence (bytes/str/int keys and values only), see mmap_hashmap.py
+  def save(self, path, load_factor = 0.75):
+    from mmap_hashmap import saveHashmap
+    saveHashmap(self, path, load_factor)
+
+  @staticmethod
+  def open_mmap(path):
+    from mmap_hashmap import MmapHashmap
+    return MmapHashmap(path)
+
+  # Batch operations
+  def put_many(self, pairs):
+    # pairs: a dict, an iterable of (key, value), or a (keys, values) tuple whose keys are
+    # a NumPy integer array (hashed vectorized, like get_many)
+    if isinstance(pairs, tuple) and len(pairs) == 2 and _isIntArray(pairs[0]):
+      keys, values = pairs
+      values = values if isinstance(values, list) else list(values)
+      if len(values) != len(keys):
+        raise ValueError(f"{len(keys)} keys but {len(values)} values")
+    else:
+      if hasattr(pairs, "items"):
+        pairs = pairs.items()
+      keys, values = [], []
+      for key, value in pairs:
+        keys.append(key)
+        values.append(value)
+    self._reserve(len(keys))
+
+    table, inserted = self.table, 0
+    hash_keys, keys = self._batchKeys(keys)
+    indexes, order = self._groupByBucket(hash_keys)
+    for position in order:
+      if table.insert(indexes[position], keys[position], values[position]):
+        inserted += 1
+    self.size += inserted
+
+    if (self.table.occupied / self.capacity) > self.threshold:
+      self._resize(self._grownCapacity())
+
+  def get_many(self, keys, default = None):
+    if self.old_table:
+      self._finishRehash()
+    hash_keys, keys = self._batchKeys(keys)
+    indexes, order = self._groupByBucket(hash_keys)
+    table, result = self.table, [default] * len(keys)
+    for position in order:
+      result[position] = table.find(indexes[position], keys[position], default)
+    return result
+
+  def remove_many(self, keys):
+    if self.old_table:
+      self._finishRehash()
+    hash_keys, keys = self._batchKeys(keys)
+    indexes, order = self._groupByBucket(hash_keys)
+    table, removed = self.table, 0
+    for position in order:
+      if table.delete(indexes[position], keys[position]):
+        removed += 1
+    self.size -= removed
+
+    if self.shrink_threshold is not None:
+      target = self.capacity
+      while target > self.min_capacity and self.size / target < self.shrink_threshold:
+        target //= 2
+      if target != self.capacity:
+        self._resize(max(self.min_capacity, target))
+        if self.old_table:
+          self._finishRehash()
+    return removed
+
+  def _batchKeys(self, keys):
+    # (keys to hash, keys to store). NumPy integer arrays are hashed vectorized but stored
+    # as plain ints; a batch of plain ints is turned into such an array when the hash
+    # function can use it.
+    if _isIntArray(keys):
+      return keys, keys.tolist()
+    keys = keys if isinstance(keys, list) else list(keys)
+    if np is not None and self.hash_function.vectorized and keys and all(type(key) is int for key in keys):
+      try:
+        return np.array(keys, dtype = np.int64), keys
+      except OverflowError:
+        pass
+    return keys, keys
+
+  def _groupByBucket(self, keys):
+    # One hashMany pass for the whole batch, then visit positions bucket by bucket.
+    # The sort is stable, so repeated keys in a put_many keep last-write-wins.
+    indexes = self.hash_function.hashMany(keys, self.capacity)
+    return indexes, sorted(range(len(indexes)), key = indexes.__getitem__)
+
+  def _reserve(self, count):
+    # Pre-size once for the whole batch instead of resizing partway through it
+    if self.old_table:
+      self._finishRehash()
+    target = self.capacity
+    while (self.table.occupied + count) / target > self.threshold:
+      target *= 2
+    if target != self.capacity:
+      self._resize(target)
+      if self.old_table:
+        self._finishRehash()
+
+  def _grownCapacity(self):
+    # Tombstones count as occupied, so a table full of deletes is rebuilt in place
+    if self.size / self.capacity <= self.threshold / 2:
+      return self.capacity
+    return self.capacity * 2
+
+  def _resize(self, new_capacity):
+    if self.old_table:
+      self._finishRehash()
+    self.old_table = self.table
+    self.rehash_index = 0
+    self.capacity = new_capacity
+    self.table = self._newTable(self.capacity)
+
+    if not self.incremental:
+      self._finishRehash()
+
+  def _migrateSlot(self, index):
+    return self.old_table.moveSlot(index, self.table, self._getIndex)
+
+  def _rehashStep(self):
+    # Like Redis, bound the empty buckets visited too so a sparse table can't stall one call
+    old_table = self.old_table
+    migrated, empty_visits = 0, self.rehash_step * 10
+    while migrated < self.rehash_step and self.rehash_index < old_table.capacity:
+      if self._migrateSlot(self.rehash_index):
+        migrated += 1
+      else:
+        empty_visits -= 1
+      self.rehash_index += 1
+      if empty_visits == 0:
+        break
+    if self.rehash_index >= old_table.capacity:
+      self.old_table = None
+
+  def _finishRehash(self):
+    while self.rehash_index < self.old_table.capacity:
+      self._migrateSlot(self.rehash_index)
+      self.rehash_index += 1
+    self.old_table = None
+
   def __str__(self):
     result = []
 
-    for i, bucket in enumerate(self.buckets):
-      node = bucket.head
-      items = []
-      while node:
-        items.append(f"({node.key}, {node.value})")
-        node = node.next
+    for i in range(self.capacity):
+      items = [f"({key}, {value})" for key, value in self.table.slotItems(i)]
       result.append(f"Bucket {i}:" + "->".join(items))
+    if self.old_table:
+      for i in range(self.rehash_index, self.old_table.capacity):
+        items = [f"({key}, {value})" for key, value in self.old_table.slotItems(i)]
+        result.append(f"Old bucket {i}:" + "->".join(items))
     return "\n".join(result)
 
 if __name__ == "__main__":
-  hm = Hashmap()
-  hm.put("apple", 10)
-  hm.put("banana", 20)
-  hm.put("orange", 30)
-  hm.put("banana", 25)
-  hm.remove("apple")
-
-  print(hm.get("banana"))
-  print(hm.get("apple"))
-  print(hm)
\ No newline at end of file
+  for storage in StorageType:
+    hm = Hashmap(storage = storage)
+    hm.put("apple", 10)
+    hm.put("banana", 20)
+    hm.put("orange", 30)
+    hm.put("banana", 25)
+    hm.remove("apple")
+
+    print(hm.get("banana"))
+    print(hm.get("apple"))
+    print(hm)
+
+  hm = Hashmap(incremental = True, rehash_step = 1, shrink_threshold = 0.1)
+  for i in range(100):
+    hm.put(i, i * i)
+  print(hm.capacity, hm.isRehashing(), hm.get(42))
+  for i in range(95):
+    hm.remove(i)
+  print(hm.capacity, hm.size, hm.get(99))
+
+  hm = Hashmap(storage = StorageType.OPEN_ADDRESSING)
+  hm.put_many((i, str(i)) for i in range(1000))
+  print(hm.capacity, hm.get_many([1, 500, 5000]), hm.remove_many(range(500)), hm.size)
+
+  # Integer keys that differ only in their high bits all collide under hash(key) % capacity
+  keys = [i << 20 for i in range(2000)]
+  for hash_function in (DefaultHashFunction(), FibonacciHashFunction(), SipHashFunction(), XXHashFunction()):
+    hm = Hashmap(capacity = 4096, hash_function = hash_function)
+    hm.put_many((key, key) for key in keys)
+    print(type(hash_function).__name__, "longest chain:", max(hm.bucketHistogram()))
@@ -0,0 +1,188 @@
+import mmap
+import os
+import struct
+from hashmap import xxh32
+
+# File layout (little endian):
+#   header | slot index (slot_count fixed-size slots, linear probing) | packed key/value heap
+# Slots point at heap records by offset, so a lookup touches one index page plus one heap page.
+_MAGIC = b"HMAP"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHQQQQQ")  # magic, version, reserved, slot_count, entry_count, index_offset, heap_offset, heap_size
+_SLOT = struct.Struct("<IIQ")          # key hash, record length, record offset + 1 (0 = empty slot)
+_RECORD = struct.Struct("<BBII")       # key tag, value tag, key length, value length
+
+_BYTES, _STR, _INT = 0, 1, 2
+
+def _encode(obj):
+  if isinstance(obj, (bytes, bytearray, memoryview)):
+    return _BYTES, bytes(obj)
+  if isinstance(obj, str):
+    return _STR, obj.encode("utf-8", "surrogatepass")
+  if isinstance(obj, int):
+    return _INT, int(obj).to_bytes(obj.bit_length() // 8 + 1, "little", signed = True)
+  raise TypeError(f"mmap Hashmap only stores bytes, str and int, got {type(obj).__name__}")
+
+def _decode(tag, data):
+  if tag == _STR:
+    return str(data, "utf-8", "surrogatepass")
+  if tag == _INT:
+    return int.from_bytes(data, "little", signed = True)
+  return bytes(data)
+
+def _keyHash(tag, data):
+  # Deterministic across processes (str hash() is salted per process); the tag seeds
+  # the hash so "1", b"1" and 1 don't collide
+  return xxh32(data, tag)
+
+def _slotCount(entries, load_factor):
+  slot_count = 1
+  while slot_count * load_factor < entries:
+    slot_count *= 2
+  return slot_count
+
+def writeTable(path, records, entry_count, load_factor = 0.75):
+  # records yields (key_tag, key_bytes, value_tag, value_bytes). The heap is streamed to
+  # disk, only the index is built in memory. Written to a temp file and renamed into
+  # place, so readers that already mapped the old file keep a consistent view.
+  if not 0 < load_factor < 1:
+    raise ValueError("load factor must be between 0 and 1")
+  slot_count = _slotCount(entry_count, load_factor)
+  mask = slot_count - 1
+  index = bytearray(slot_count * _SLOT.size)
+  index_offset = _HEADER.size
+  heap_offset = index_offset + len(index)
+  tmp_path = f"{path}.tmp"
+
+  with open(tmp_path, "wb") as f:
+    f.seek(heap_offset)
+    heap_size = written = 0
+    for key_tag, key_data, value_tag, value_data in records:
+      if written == entry_count:
+        raise ValueError("more records than entry_count")
+      key_hash = _keyHash(key_tag, key_data)
+      slot = key_hash & mask
+      while _SLOT.unpack_from(index, slot * _SLOT.size)[2]:
+        slot = (slot + 1) & mask
+      record = _RECORD.pack(key_tag, value_tag, len(key_data), len(value_data)) + key_data + value_data
+      _SLOT.pack_into(index, slot * _SLOT.size, key_hash, len(record), heap_size + 1)
+      f.write(record)
+      heap_size += len(record)
+      written += 1
+
+    f.seek(0)
+    f.write(_HEADER.pack(_MAGIC, _VERSION, 0, slot_count, written, index_offset, heap_offset, heap_size))
+    f.write(index)
+    f.flush()
+    os.fsync(f.fileno())
+  os.replace(tmp_path, path)
+
+def saveHashmap(hashmap, path, load_factor = 0.75):
+  def records():
+    for table in (hashmap.old_table, hashmap.table):
+      if table:
+        for key, value in table.items():
+          yield _encode(key) + _encode(value)
+  writeTable(path, records(), hashmap.size, load_factor)
+
+class MmapHashmap:
+  # Read-only view over a saved Hashmap. Nothing is deserialized up front: get() probes
+  # the index and decodes one record straight from the page cache, and the same file
+  # can be mapped by many worker processes at once.
+  def __init__(self, path):
+    self.path = path
+    with open(path, "rb") as f:
+      self.mm = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+    self.view = memoryview(self.mm)
+    magic, version, _, self.slot_count, self.size, self.index_offset, self.heap_offset, self.heap_size = \
+      _HEADER.unpack_from(self.mm, 0)
+    if magic != _MAGIC or version != _VERSION:
+      self.close()
+      raise ValueError(f"{path} is not a Hashmap file")
+
+  def _findRecord(self, key):
+    key_tag, key_data = _encode(key)
+    key_hash = _keyHash(key_tag, key_data)
+    mask = self.slot_count - 1
+    slot = key_hash & mask
+    for _ in range(self.slot_count):
+      slot_hash, _, offset = _SLOT.unpack_from(self.mm, self.index_offset + slot * _SLOT.size)
+      if not offset:
+        return None
+      if slot_hash == key_hash:
+        start = self.heap_offset + offset - 1
+        tag, value_tag, key_len, value_len = _RECORD.unpack_from(self.mm, start)
+        key_start = start + _RECORD.size
+        if tag == key_tag and self.view[key_start:key_start + key_len] == key_data:
+          return value_tag, key_start + key_len, value_len
+      slot = (slot + 1) & mask
+    return None
+
+  def get(self, key, default = None):
+    record = self._findRecord(key)
+    if record is None:
+      return default
+    value_tag, start, length = record
+    return _decode(value_tag, self.view[start:start + length])
+
+  def getBuffer(self, key):
+    # Zero-copy: a memoryview into the mapping. Release it before close().
+    record = self._findRecord(key)
+    if record is None:
+      return None
+    _, start, length = record
+    return self.view[start:start + length]
+
+  def __contains__(self, key):
+    return self._findRecord(key) is not None
+
+  def __len__(self):
+    return self.size
+
+  def records(self):
+    # Raw (key_tag, key_bytes, value_tag, value_bytes) in slot order
+    for slot in range(self.slot_count):
+      _, _, offset = _SLOT.unpack_from(self.mm, self.index_offset + slot * _SLOT.size)
+      if offset:
+        start = self.heap_offset + offset - 1
+        key_tag, value_tag, key_len, value_len = _RECORD.unpack_from(self.mm, start)
+        key_start = start + _RECORD.size
+        value_start = key_start + key_len
+        yield key_tag, bytes(self.view[key_start:value_start]), value_tag, bytes(self.view[value_start:value_start + value_len])
+
+  def items(self):
+    for key_tag, key_data, value_tag, value_data in self.records():
+      yield _decode(key_tag, key_data), _decode(value_tag, value_data)
+
+  def close(self):
+    self.view.release()
+    self.mm.close()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+def compact(path, out_path = None, load_factor = 0.75):
+  # Rewrites a table with its index re-sized for load_factor and heap records laid out
+  # in slot order, so a probe and the records it reads sit on neighbouring pages
+  with MmapHashmap(path) as table:
+    writeTable(out_path or path, table.records(), len(table), load_factor)
+
+if __name__ == "__main__":
+  import tempfile
+  from hashmap import Hashmap
+
+  hm = Hashmap()
+  hm.put("apple", 10)
+  hm.put("banana", b"yellow")
+  hm.put(42, "answer")
+  path = os.path.join(tempfile.mkdtemp(), "fruits.hmap")
+  hm.save(path)
+
+  with Hashmap.open_mmap(path) as table:
+    print(table.get("apple"), table.get("banana"), table.get(42), table.get("cherry"), len(table))
+  compact(path, load_factor = 0.5)
+  with Hashmap.open_mmap(path) as table:
+    print(sorted(table.items(), key = str), table.slot_count)
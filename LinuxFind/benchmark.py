@@ -0,0 +1,116 @@
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from linux_find import (File, FileType, FileTypeFilter, FindCommand, GlobFilter, MinSizeFilter, MtimeFilter,
+                        NotFilter, RegexFilter)
+from parallel_find import parallelFind
+from scandir_source import ScanMode, loadTree
+
+_EXTENSIONS = (".txt", ".log", ".bin")
+
+def makeTree(root, files, per_dir, fanout, seed = 7):
+  # Synthetic tree: directories nested fanout wide, per_dir files in each, sparse files
+  # of random size (truncate doesn't write data, so building 1M files stays cheap)
+  rng = random.Random(seed)
+  dirs, made = [root], 0
+  while made < files:
+    parent = dirs[len(dirs) // fanout]
+    directory = os.path.join(parent, f"d{len(dirs)}")
+    os.mkdir(directory)
+    dirs.append(directory)
+    for i in range(min(per_dir, files - made)):
+      with open(os.path.join(directory, f"f{i}{rng.choice(_EXTENSIONS)}"), "wb") as f:
+        f.truncate(rng.randrange(1 << 20))
+    made += per_dir
+  return len(dirs)
+
+def scandirBenchmark(args):
+  root = args.root
+  if root is None:
+    root = tempfile.mkdtemp(prefix = "find-bench-")
+    start = time.perf_counter()
+    dirs = makeTree(root, args.files, args.per_dir, args.fanout)
+    print(f"built {args.files:,} files in {dirs:,} directories under {root} in {time.perf_counter() - start:.1f}s")
+  try:
+    filters = [MinSizeFilter(512 * 1024), FileTypeFilter(FileType.LOG)]
+    print(f"{'mode':<12}{'workers':>8}{'scan secs':>12}{'files/sec':>14}{'matches':>10}")
+    for mode in args.modes:
+      for workers in ([1] if mode is ScanMode.SERIAL else args.workers):
+        start = time.perf_counter()
+        tree = loadTree(root, mode, workers)
+        elapsed = time.perf_counter() - start
+        files = sum(1 for node in tree.walk() if not node.is_directory)
+        matches = len(FindCommand().findWithFilters(tree, filters))
+        print(f"{mode.value:<12}{workers:>8}{elapsed:>12.2f}{files / elapsed:>14,.0f}{matches:>10,}")
+        del tree
+  finally:
+    if args.root is None and not args.keep:
+      shutil.rmtree(root)
+
+def makeMemoryTree(files, top_level, seed = 7):
+  # In-memory tree: top_level directories, each with a few nested levels of files
+  rng = random.Random(seed)
+  types = (FileType.TEXT, FileType.LOG, FileType.BINARY)
+  root = File("root", 0, FileType.DIRECTORY, True)
+  for t in range(top_level):
+    top = File(f"top{t}", 0, FileType.DIRECTORY, True)
+    for d in range(8):
+      directory = File(f"d{d}", 0, FileType.DIRECTORY, True, [
+        File(f"file_{t}_{d}_{i}{rng.choice(_EXTENSIONS)}", rng.randrange(1 << 20), rng.choice(types), mtime = rng.random() * 1e9)
+        for i in range(files // top_level // 8)
+      ])
+      top.addChild(directory)
+    root.addChild(top)
+  return root
+
+def parallelBenchmark(args):
+  root = makeMemoryTree(args.files, args.top_level)
+  # Regexes every file has to run through: the cost is predicate evaluation, not walking
+  filters = [
+    RegexFilter(r"^file_\d+_\d+_\d+"),
+    GlobFilter("*_*_*.*"),
+    NotFilter(RegexFilter(r"(ab|cd|ef)+z")),
+    MtimeFilter(after = 1e8) | RegexFilter(r"[13579]\.log$"),
+    MinSizeFilter(args.min_size),
+  ]
+  start = time.perf_counter()
+  expected = list(FindCommand().iter_find(root, filters))
+  serial = time.perf_counter() - start
+  print(f"{args.files:,} files, {len(expected):,} matches")
+  print(f"{'mode':<20}{'workers':>8}{'secs':>10}{'speedup':>10}")
+  print(f"{'serial iter_find':<20}{1:>8}{serial:>10.2f}{1:>10.2f}")
+  for ordered in (False, True):
+    for workers in args.workers:
+      start = time.perf_counter()
+      matches = list(parallelFind(root, filters, workers, ordered = ordered))
+      elapsed = time.perf_counter() - start
+      assert len(matches) == len(expected) and (not ordered or matches == expected)
+      name = "parallel ordered" if ordered else "parallel"
+      print(f"{name:<20}{workers:>8}{elapsed:>10.2f}{serial / elapsed:>10.2f}")
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description = "LinuxFind benchmarks")
+  commands = parser.add_subparsers(dest = "command", required = True)
+
+  scandir = commands.add_parser("scandir", help = "serial vs threaded vs process pool traversal of a real tree")
+  scandir.add_argument("--root", help = "existing directory to scan (default: build a synthetic tree in a temp dir)")
+  scandir.add_argument("--files", type = int, default = 1_000_000)
+  scandir.add_argument("--per-dir", type = int, default = 1_000)
+  scandir.add_argument("--fanout", type = int, default = 8)
+  scandir.add_argument("--modes", type = ScanMode, nargs = "+", default = list(ScanMode))
+  scandir.add_argument("--workers", type = int, nargs = "+", default = [4, 8])
+  scandir.add_argument("--keep", action = "store_true", help = "don't delete the synthetic tree afterwards")
+  scandir.set_defaults(run = scandirBenchmark)
+
+  parallel = commands.add_parser("parallel", help = "process pool find vs serial on a CPU heavy filter chain")
+  parallel.add_argument("--files", type = int, default = 1_000_000)
+  parallel.add_argument("--top-level", type = int, default = 64, help = "top-level directories to split across workers")
+  parallel.add_argument("--workers", type = int, nargs = "+", default = [1, 2, 4, 8])
+  parallel.add_argument("--min-size", type = int, default = 1 << 19)
+  parallel.set_defaults(run = parallelBenchmark)
+
+  args = parser.parse_args()
+  args.run(args)
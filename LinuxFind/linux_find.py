@@ -1,4 +1,10 @@
+import fnmatch
+import re
 from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right
+from collections import deque
+from itertools import islice
+from operator import attrgetter
 from typing import List, Optional
 from enum import Enum
 
@@ -8,36 +14,624 @@ class FileType(Enum):
   LOG = 2
   BINARY = 3
 
+class TraversalOrder(Enum):
+  DFS = "dfs"
+  BFS = "bfs"
+
+class _Children(list):
+  # File.children: a plain list to read, but editing it directly (instead of through
+  # addChild/removeChild) adopts the new children and marks the directory's aggregates
+  # and index stale, so the next find refreshes them rather than trusting them
+  __slots__ = ("owner",)
+
+  def __init__(self, owner, children = ()):
+    super().__init__(children)
+    self.owner = owner
+    for child in self:
+      child.parent = owner
+
+  def _edited(self, added = ()):
+    owner = getattr(self, "owner", None)   # unset while unpickling
+    if owner is not None:
+      for child in added:
+        child.parent = owner
+      owner._changed()
+
+  def append(self, child):
+    super().append(child)
+    self._edited((child,))
+
+  def insert(self, i, child):
+    super().insert(i, child)
+    self._edited((child,))
+
+  def extend(self, children):
+    start = len(self)
+    super().extend(children)
+    self._edited(self[start:])
+
+  def __iadd__(self, children):
+    self.extend(children)
+    return self
+
+  def __imul__(self, n):
+    super().__imul__(n)
+    self._edited()
+    return self
+
+  def __setitem__(self, i, value):
+    added = list(value) if isinstance(i, slice) else [value]
+    super().__setitem__(i, added if isinstance(i, slice) else value)
+    self._edited(added)
+
+  def __delitem__(self, i):
+    super().__delitem__(i)
+    self._edited()
+
+  def remove(self, child):
+    super().remove(child)
+    self._edited()
+
+  def pop(self, i = -1):
+    child = super().pop(i)
+    self._edited()
+    return child
+
+  def clear(self):
+    super().clear()
+    self._edited()
+
 class File:
-  def __init__(self, name, size, file_type, is_directory = False, children: Optional[List["File"]] = None):
+  def __init__(self, name, size, file_type, is_directory = False, children: Optional[List["File"]] = None, mtime = 0.0):
+    self.parent = None
+    self.index = None
     self.name = name
-    self.size = size
-    self.file_type = file_type
+    self._size = size
+    self._file_type = file_type
     self.is_directory = is_directory
-    self.children = children or []
+    self.mtime = mtime
+    self._children = _Children(self, children or [])
+    self._stale = False
+    if is_directory:
+      self._resetAggregates()
+      for child in self.children:
+        self._addAggregates(child)
+        if child._stale:
+          self._stale = True
   
   def __repr__(self):
     return f"<Name: {self.name}, size: {self.size}, file_type: {self.file_type.name}>"
+
+  # The aggregates depend on children, size and file_type, so setting one of them
+  # counts as a direct edit
+  @property
+  def children(self):
+    return self._children
+
+  @children.setter
+  def children(self, children):
+    self._children = _Children(self, children)
+    self._changed()
+
+  @property
+  def size(self):
+    return self._size
+
+  @size.setter
+  def size(self, size):
+    self._size = size
+    self._attributeChanged()
+
+  @property
+  def file_type(self):
+    return self._file_type
+
+  @file_type.setter
+  def file_type(self, file_type):
+    self._file_type = file_type
+    self._attributeChanged()
+
+  def _attributeChanged(self):
+    if self.index is not None:
+      self.index.stale = True
+    if self.parent is not None:
+      self.parent._markStale()
+
+  def walk(self):
+    # self and every descendant, parents before children
+    stack = [self]
+    while stack:
+      node = stack.pop()
+      yield node
+      stack.extend(reversed(node.children))
+
+  def addChild(self, child: "File"):
+    if not self.is_directory:
+      raise NotADirectory(f"{self.name} is not a directory")
+    child.parent = self
+    list.append(self.children, child)
+    if child._stale:
+      self._markStale()
+    else:
+      node = self
+      while node is not None:
+        node._addAggregates(child)
+        node = node.parent
+    if self.index is not None and not self.index.stale:
+      self.index.addTree(child)
+
+  def removeChild(self, child: "File"):
+    list.remove(self.children, child)
+    child.parent = None
+    if child._stale:
+      self._markStale()
+    else:
+      node = self
+      while node is not None:
+        node._removeAggregates(child)
+        node = node.parent
+    if self.index is not None and not self.index.stale:
+      self.index.removeTree(child)
+
+  def _changed(self):
+    # A direct edit of self's children or of a child's size or type
+    if self.index is not None:
+      self.index.stale = True
+    self._markStale()
+
+  def _markStale(self):
+    # Marks self and its ancestors up to the first one already stale, whose ancestors
+    # are stale too
+    node = self
+    while node is not None and not node._stale:
+      node._stale = True
+      node = node.parent
+
+  # Directory aggregates over every file below: file_count, max_size, type_counts per
+  # FileType and type_mask (bit 1 << FileType.value set when that type occurs). addChild
+  # and removeChild update them along the path to the root. Direct edits (children
+  # lists, a file's size or type) only mark the directories above stale, and
+  # refreshAggregates() recomputes those before a find relies on them.
+  def _resetAggregates(self):
+    self.file_count = 0
+    self.max_size = 0
+    self.type_counts = [0] * len(FileType)
+    self.type_mask = 0
+
+  def _addAggregates(self, child: "File"):
+    if child.is_directory:
+      self.file_count += child.file_count
+      self.max_size = max(self.max_size, child.max_size)
+      for i, count in enumerate(child.type_counts):
+        self.type_counts[i] += count
+      self.type_mask |= child.type_mask
+    else:
+      self.file_count += 1
+      self.max_size = max(self.max_size, child.size)
+      self.type_counts[child.file_type.value] += 1
+      self.type_mask |= 1 << child.file_type.value
+
+  def _removeAggregates(self, child: "File"):
+    # The largest size can't be subtracted out; it's recomputed from the direct children
+    # when the removed subtree held it
+    if child.is_directory:
+      self.file_count -= child.file_count
+      removed_max = child.max_size
+      for i, count in enumerate(child.type_counts):
+        self.type_counts[i] -= count
+    else:
+      self.file_count -= 1
+      removed_max = child.size
+      self.type_counts[child.file_type.value] -= 1
+    self.type_mask = sum(1 << i for i, count in enumerate(self.type_counts) if count)
+    if removed_max >= self.max_size:
+      self.max_size = max((node.max_size if node.is_directory else node.size for node in self.children), default = 0)
+
+  def rebuildAggregates(self):
+    directories = [node for node in self.walk() if node.is_directory]
+    for directory in reversed(directories):
+      directory._resetAggregates()
+      for child in directory.children:
+        directory._addAggregates(child)
+      directory._stale = False
+
+  def refreshAggregates(self):
+    # Recomputes only the stale directories under self, children before parents; a
+    # directory that isn't stale has nothing stale below it
+    if not self._stale:
+      return
+    stale, stack = [], [self]
+    while stack:
+      directory = stack.pop()
+      stale.append(directory)
+      stack.extend(child for child in directory.children if child._stale)
+    for directory in reversed(stale):
+      directory._resetAggregates()
+      for child in directory.children:
+        directory._addAggregates(child)
+      directory._stale = False
+
+_size = attrgetter("_size")
+
+class FileIndex:
+  # Secondary indexes over the files (not directories) under root: a posting list per
+  # FileType and a size-sorted array for range lookups. Every node under root points
+  # at the index, so File.addChild/removeChild keep it current.
+  # Subtrees of up to merge_threshold files are placed with one bisect and insert per
+  # file; bigger ones are merged into (or filtered out of) the size array in one pass.
+  merge_threshold = 32
+
+  def __init__(self, root: File):
+    self.root = root
+    self._build()
+
+  def _build(self):
+    self.by_type = {file_type: {} for file_type in FileType}
+    self.directories = {}
+    files = []
+    for node in self.root.walk():
+      node.index = self
+      if node.is_directory:
+        self.directories[node] = None
+      else:
+        self.by_type[node.file_type][node] = None
+        files.append(node)
+    files.sort(key = _size)
+    self.files = files
+    self.sizes = [file.size for file in files]
+    # Set by a direct edit under root, which the index can't follow incrementally
+    self.stale = False
+
+  def rebuild(self):
+    # Nodes edited out of the tree stop pointing here
+    for nodes in (self.directories, *self.by_type.values()):
+      for node in nodes:
+        node.index = None
+    self._build()
+
+  def __len__(self):
+    return len(self.files)
+
+  def addTree(self, tree: File):
+    added = []
+    for node in tree.walk():
+      node.index = self
+      if node.is_directory:
+        self.directories[node] = None
+      else:
+        self.by_type[node.file_type][node] = None
+        added.append(node)
+    if len(added) <= self.merge_threshold:
+      for node in added:
+        i = bisect_right(self.sizes, node.size)
+        self.sizes.insert(i, node.size)
+        self.files.insert(i, node)
+    else:
+      # Two sorted runs: the stable sort merges them in linear time and keeps new files
+      # after existing ones of the same size, like bisect_right
+      added.sort(key = _size)
+      files = self.files + added
+      files.sort(key = _size)
+      self.files = files
+      self.sizes = list(map(_size, files))
+
+  def removeTree(self, tree: File):
+    removed = []
+    for node in tree.walk():
+      node.index = None
+      if node.is_directory:
+        del self.directories[node]
+      else:
+        del self.by_type[node.file_type][node]
+        removed.append(node)
+    if len(removed) <= self.merge_threshold:
+      for node in removed:
+        i = bisect_left(self.sizes, node.size)
+        while self.files[i] is not node:
+          i += 1
+        del self.sizes[i]
+        del self.files[i]
+    else:
+      self.files = [file for file in self.files if file.index is self]
+      self.sizes = list(map(_size, self.files))
+
+  def estimate(self, filter: "Filter"):
+    # Number of candidates a lookup would produce, None if the filter isn't indexed
+    # (including subclasses that override apply: the index answers the base test)
+    if isinstance(filter, FileTypeFilter) and filter._ownApply(FileTypeFilter):
+      return len(self.by_type[filter.file_type])
+    if isinstance(filter, MinSizeFilter) and filter._ownApply(MinSizeFilter):
+      return len(self.sizes) - bisect_left(self.sizes, filter.min_size)
+    return None
+
+  def lookup(self, filter: "Filter"):
+    if isinstance(filter, FileTypeFilter):
+      return iter(self.by_type[filter.file_type])
+    start = bisect_left(self.sizes, filter.min_size)
+    return (self.files[i] for i in range(start, len(self.files)))
   
 class Filter(ABC):
+  # cost: relative price of one apply(). selectivity: expected fraction of files that
+  # pass. FilterPipeline uses both to decide which filters to run first.
+  cost = 1.0
+  selectivity = 0.5
+
   @abstractmethod
   def apply(self, file: File):
     pass
 
+  def expression(self, file_var, env):
+    # Python source for this test on file_var, for FilterPipeline to fuse into one
+    # lambda. Constants go into env. The default just calls apply.
+    return f"{constant(env, self.apply)}({file_var})"
+
+  def subtreeExpression(self, dir_var, env):
+    # Python source that is false when no file under dir_var can pass, judged from the
+    # directory aggregates; None when the filter can't rule a subtree out
+    return None
+
+  def _ownApply(self, cls):
+    # cls's expression() and subtreeExpression() inline cls.apply; a subclass that
+    # overrides apply must get the generic call instead (and no pruning)
+    return type(self).apply is cls.apply
+
+  def __and__(self, other):
+    return AndFilter(self, other)
+
+  def __or__(self, other):
+    return OrFilter(self, other)
+
+  def __invert__(self):
+    return NotFilter(self)
+
+  def __repr__(self):
+    return f"{type(self).__name__}({', '.join(f'{value!r}' for value in vars(self).values())})"
+
+def constant(env, value):
+  name = f"_c{len(env)}"
+  env[name] = value
+  return name
+
+def rank(filter: Filter, selectivity = None):
+  # Expected cost per file rejected; running filters in ascending rank minimises the
+  # total cost of an AND chain
+  selectivity = filter.selectivity if selectivity is None else selectivity
+  return filter.cost / max(1.0 - selectivity, 1e-9)
+
 class MinSizeFilter(Filter):
   def __init__(self, min_size):
     self.min_size = min_size
 
   def apply(self, file: File):
     return self.min_size <= file.size
+
+  def expression(self, file_var, env):
+    if not self._ownApply(MinSizeFilter):
+      return super().expression(file_var, env)
+    # Compiled predicates read the backing fields and skip the property call
+    return f"{constant(env, self.min_size)} <= {file_var}._size"
+
+  def subtreeExpression(self, dir_var, env):
+    if not self._ownApply(MinSizeFilter):
+      return None
+    return f"{constant(env, self.min_size)} <= {dir_var}.max_size"
   
 class FileTypeFilter(Filter):
+  selectivity = 1 / len(FileType)
+
   def __init__(self, file_type):
     self.file_type = file_type
   
   def apply(self, file: File):
     return file.file_type == self.file_type
 
+  def expression(self, file_var, env):
+    if not self._ownApply(FileTypeFilter):
+      return super().expression(file_var, env)
+    return f"{file_var}._file_type == {constant(env, self.file_type)}"
+
+  def subtreeExpression(self, dir_var, env):
+    if not self._ownApply(FileTypeFilter):
+      return None
+    return f"{dir_var}.type_mask & {1 << self.file_type.value}"
+
+class NameFilter(Filter):
+  selectivity = 0.01
+
+  def __init__(self, name):
+    self.name = name
+
+  def apply(self, file: File):
+    return file.name == self.name
+
+  def expression(self, file_var, env):
+    if not self._ownApply(NameFilter):
+      return super().expression(file_var, env)
+    return f"{file_var}.name == {constant(env, self.name)}"
+
+class RegexFilter(Filter):
+  # Matches anywhere in the name, like re.search
+  cost = 5.0
+  selectivity = 0.1
+
+  def __init__(self, pattern):
+    self.pattern = re.compile(pattern)
+
+  def apply(self, file: File):
+    return self.pattern.search(file.name) is not None
+
+  def expression(self, file_var, env):
+    if not self._ownApply(RegexFilter):
+      return super().expression(file_var, env)
+    return f"{constant(env, self.pattern.search)}({file_var}.name) is not None"
+
+  def __repr__(self):
+    return f"RegexFilter({self.pattern.pattern!r})"
+
+class GlobFilter(RegexFilter):
+  # Shell pattern on the whole name, like find -name
+  cost = 3.0
+
+  def __init__(self, pattern):
+    self.glob = pattern
+    self.pattern = re.compile(fnmatch.translate(pattern))
+
+  def __repr__(self):
+    return f"GlobFilter({self.glob!r})"
+
+class MtimeFilter(Filter):
+  # Modified in [after, before); either bound can be left open
+  def __init__(self, after = None, before = None):
+    self.after = after
+    self.before = before
+
+  def apply(self, file: File):
+    return (self.after is None or self.after <= file.mtime) and (self.before is None or file.mtime < self.before)
+
+  def expression(self, file_var, env):
+    if not self._ownApply(MtimeFilter):
+      return super().expression(file_var, env)
+    tests = []
+    if self.after is not None:
+      tests.append(f"{constant(env, self.after)} <= {file_var}.mtime")
+    if self.before is not None:
+      tests.append(f"{file_var}.mtime < {constant(env, self.before)}")
+    return " and ".join(tests) or "True"
+
+class AndFilter(Filter):
+  def __init__(self, *filters):
+    self.filters = sorted(filters, key = rank)
+    self.cost = sum(filter.cost for filter in filters)
+    self.selectivity = 1.0
+    for filter in filters:
+      self.selectivity *= filter.selectivity
+
+  def apply(self, file: File):
+    return all(filter.apply(file) for filter in self.filters)
+
+  def expression(self, file_var, env):
+    if not self._ownApply(AndFilter):
+      return super().expression(file_var, env)
+    return "(" + " and ".join(f"({filter.expression(file_var, env)})" for filter in self.filters) + ")" if self.filters else "True"
+
+  def subtreeExpression(self, dir_var, env):
+    if not self._ownApply(AndFilter):
+      return None
+    tests = [test for test in (filter.subtreeExpression(dir_var, env) for filter in self.filters) if test is not None]
+    return "(" + " and ".join(f"({test})" for test in tests) + ")" if tests else None
+
+  def __repr__(self):
+    return f"AndFilter{tuple(self.filters)}"
+
+class OrFilter(Filter):
+  def __init__(self, *filters):
+    # Cheap filters likely to pass go first, so the chain usually stops early
+    self.filters = sorted(filters, key = lambda filter: filter.cost / max(filter.selectivity, 1e-9))
+    self.cost = sum(filter.cost for filter in filters)
+    miss = 1.0
+    for filter in filters:
+      miss *= 1.0 - filter.selectivity
+    self.selectivity = 1.0 - miss
+
+  def apply(self, file: File):
+    return any(filter.apply(file) for filter in self.filters)
+
+  def expression(self, file_var, env):
+    if not self._ownApply(OrFilter):
+      return super().expression(file_var, env)
+    return "(" + " or ".join(f"({filter.expression(file_var, env)})" for filter in self.filters) + ")" if self.filters else "False"
+
+  def subtreeExpression(self, dir_var, env):
+    # Prunable only if every alternative is
+    if not self._ownApply(OrFilter):
+      return None
+    tests = [filter.subtreeExpression(dir_var, env) for filter in self.filters]
+    if None in tests:
+      return None
+    return "(" + " or ".join(f"({test})" for test in tests) + ")" if tests else "False"
+
+  def __repr__(self):
+    return f"OrFilter{tuple(self.filters)}"
+
+class NotFilter(Filter):
+  def __init__(self, filter: Filter):
+    self.filter = filter
+    self.cost = filter.cost
+    self.selectivity = 1.0 - filter.selectivity
+
+  def apply(self, file: File):
+    return not self.filter.apply(file)
+
+  def expression(self, file_var, env):
+    if not self._ownApply(NotFilter):
+      return super().expression(file_var, env)
+    return f"not ({self.filter.expression(file_var, env)})"
+
+  def __repr__(self):
+    return f"NotFilter({self.filter!r})"
+
+class FilterPipeline:
+  # The filters of one find, ANDed and compiled into a single lambda (one call per file
+  # instead of a generator plus an apply() per filter), cheapest rank first.
+  # Every sample_every-th file the walk calls observe() instead, which runs each filter
+  # separately and counts rejections. Every adapt_every samples the observed pass rates
+  # replace the declared selectivities and the predicate is recompiled if the order changed.
+  def __init__(self, filters: List[Filter], sample_every = 64, adapt_every = 256):
+    self.filters = sorted(filters, key = rank)
+    self.sample_every = sample_every
+    self.adapt_every = adapt_every
+    self.evaluated = {id(filter): 0 for filter in self.filters}
+    self.rejected = {id(filter): 0 for filter in self.filters}
+    self.samples = 0
+    self.recompiles = 0
+    self.pruned = 0
+    self.predicate = self._compile()
+    self.may_contain = self._compileSubtreeTest()
+
+  def _compile(self):
+    env = {}
+    body = " and ".join(f"({filter.expression('file', env)})" for filter in self.filters) or "True"
+    return eval(f"lambda file: {body}", env)
+
+  def _compileSubtreeTest(self):
+    # Directory -> False when the aggregates prove nothing below it can match
+    env = {}
+    tests = ["directory.file_count"]
+    for filter in self.filters:
+      test = filter.subtreeExpression("directory", env)
+      if test is not None:
+        tests.append(f"({test})")
+    return eval(f"lambda directory: bool({' and '.join(tests)})", env)
+
+  def observe(self, file: File):
+    passed = True
+    for filter in self.filters:
+      self.evaluated[id(filter)] += 1
+      if not filter.apply(file):
+        self.rejected[id(filter)] += 1
+        passed = False
+    self.samples += 1
+    if self.samples % self.adapt_every == 0:
+      self._adapt()
+    return passed
+
+  def _adapt(self):
+    def observedRank(filter):
+      # Declared selectivity counts as one sample's worth of prior
+      evaluated = self.evaluated[id(filter)]
+      passes = evaluated - self.rejected[id(filter)]
+      return rank(filter, (passes + filter.selectivity) / (evaluated + 1))
+
+    order = sorted(self.filters, key = observedRank)
+    if order != self.filters:
+      self.filters = order
+      self.predicate = self._compile()
+      self.recompiles += 1
+
+  def stats(self):
+    return [{"filter": repr(filter), "evaluated": self.evaluated[id(filter)], "rejected": self.rejected[id(filter)]}
+            for filter in self.filters]
+
 class NotADirectory(Exception):
   pass
 
@@ -45,9 +639,94 @@ class FindCommand:
   def findWithFilters(self, directory: File, filters: List[Filter]):
     if not directory.is_directory:
       raise NotADirectory(f"{directory.name} is not a directory")
+    driver = self.plan(directory, filters)
+    if driver is not None:
+      return self.indexedFind(directory, filters, driver)
+    return list(self.iter_find(directory, filters))
+
+  def iter_find(self, directory: File, filters: List[Filter], limit: Optional[int] = None,
+                max_depth: Optional[int] = None, order: TraversalOrder = TraversalOrder.DFS):
+    # Lazy find: yields matches as the walk reaches them and stops walking after limit
+    # matches. An explicit stack (DFS, same order as recurse) or queue (BFS) replaces the
+    # recursion, so depth is unbounded. max_depth=1 only looks at directory's own children.
+    if not directory.is_directory:
+      raise NotADirectory(f"{directory.name} is not a directory")
+    directory.refreshAggregates()
+    self.pipeline = FilterPipeline(filters)
+    matches = self._walk(directory, self.pipeline, max_depth, order)
+    return matches if limit is None else islice(matches, limit)
+
+  def _walk(self, directory: File, pipeline: FilterPipeline, max_depth: Optional[int], order: TraversalOrder):
+    dfs = order is TraversalOrder.DFS
+    pending = deque((child, 1) for child in (reversed(directory._children) if dfs else directory._children))
+    take = pending.pop if dfs else pending.popleft
+    predicate, sample_every, countdown = pipeline.predicate, pipeline.sample_every, pipeline.sample_every
+    may_contain = pipeline.may_contain
+    if not may_contain(directory):
+      pipeline.pruned += 1
+      return
+    while pending:
+      node, depth = take()
+      if not node.is_directory:
+        countdown -= 1
+        if countdown:
+          if predicate(node):
+            yield node
+        else:
+          countdown = sample_every
+          if pipeline.observe(node):
+            yield node
+          predicate = pipeline.predicate
+      elif max_depth is None or depth < max_depth:
+        if not may_contain(node):
+          pipeline.pruned += 1
+          continue
+        children = reversed(node._children) if dfs else node._children
+        pending.extend((child, depth + 1) for child in children)
+
+  def plan(self, directory: File, filters: List[Filter]):
+    # Picks the indexed filter with the fewest candidates to drive the query, or None
+    # for a full scan (no index, or none of the filters is indexed)
+    index = directory.index
+    if index is None:
+      return None
+    if index.stale:
+      index.rebuild()
+      # The rebuild drops nodes that were edited out from under the indexed root
+      index = directory.index
+      if index is None:
+        return None
+    driver, best = None, None
+    for filter in filters:
+      estimate = index.estimate(filter)
+      if estimate is not None and (best is None or estimate < best):
+        driver, best = filter, estimate
+    return driver
+
+  def indexedFind(self, directory: File, filters: List[Filter], driver: Filter):
+    # Candidates come from the index, in index order rather than tree order. The other
+    # filters are checked per candidate, and for a subdirectory of the indexed root so
+    # is the candidate's ancestry.
+    self.pipeline = FilterPipeline([filter for filter in filters if filter is not driver])
+    predicate = self.pipeline.predicate
+    index = directory.index
+    whole = directory is index.root
     output = []
-    self.recurse(directory, filters, output)
+    for file in index.lookup(driver):
+      if predicate(file) and (whole or self.isUnder(file, directory)):
+        output.append(file)
     return output
+
+  @staticmethod
+  def isUnder(file: File, directory: File):
+    if directory is file.index.root:
+      return True
+    node = file.parent
+    while node is not None:
+      if node is directory:
+        return True
+      node = node.parent
+    return False
   
   def recurse(self, node: File, filters: List[Filter], output: List[File]):
     for child in node.children:
@@ -72,4 +751,23 @@ if __name__ == "__main__":
   filters = [MinSizeFilter(400), FileTypeFilter(FileType.LOG)]
 
   matches = cmd.findWithFilters(root, filters)
-  print(matches)
\ No newline at end of file
+  print(matches)
+
+  FileIndex(root)
+  print(cmd.plan(root, filters).__class__.__name__, cmd.findWithFilters(root, filters))  # FileTypeFilter, same two logs
+  root.children[3].addChild(File("f.log", 5000, FileType.LOG))
+  root.removeChild(root.children[1])
+  print(cmd.findWithFilters(root, filters), cmd.findWithFilters(root.children[2], [MinSizeFilter(2000)]))
+
+  deep = File("deep", 0, FileType.DIRECTORY, True)
+  node = deep
+  for level in range(5000):   # deeper than the recursion limit
+    node.addChild(File(f"{level}.log", level, FileType.LOG))
+    node.addChild(File(f"level_{level}", 0, FileType.DIRECTORY, True))
+    node = node.children[-1]
+  print(list(cmd.iter_find(deep, [MinSizeFilter(100)], limit = 3)))
+  print(list(cmd.iter_find(root, [], order = TraversalOrder.BFS)), list(cmd.iter_find(root, [], max_depth = 1)))
+
+  either = GlobFilter("*.log") | (FileTypeFilter(FileType.TEXT) & ~MinSizeFilter(500))
+  print(cmd.findWithFilters(root, [either, RegexFilter("^[a-e]")]))  # d.log, e.txt
+  print(cmd.pipeline.stats())
\ No newline at end of file
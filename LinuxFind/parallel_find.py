@@ -0,0 +1,154 @@
+import multiprocessing
+import queue
+from collections import namedtuple
+from typing import List, Optional
+from linux_find import (AndFilter, File, FileTypeFilter, Filter, FilterPipeline, FindCommand, GlobFilter,
+                        MinSizeFilter, MtimeFilter, NameFilter, NotADirectory, NotFilter, OrFilter, RegexFilter)
+
+# Filters cross the process boundary as specs: the class name plus constructor arguments,
+# with nested filters (combinators) as nested specs
+FilterSpec = namedtuple("FilterSpec", "kind args")
+
+_SPEC_ARGS = {
+  MinSizeFilter: lambda filter: (filter.min_size,),
+  FileTypeFilter: lambda filter: (filter.file_type,),
+  NameFilter: lambda filter: (filter.name,),
+  RegexFilter: lambda filter: (filter.pattern.pattern,),
+  GlobFilter: lambda filter: (filter.glob,),
+  MtimeFilter: lambda filter: (filter.after, filter.before),
+  AndFilter: lambda filter: tuple(filter.filters),
+  OrFilter: lambda filter: tuple(filter.filters),
+  NotFilter: lambda filter: (filter.filter,),
+}
+_FILTER_CLASSES = {cls.__name__: cls for cls in _SPEC_ARGS}
+
+def filterSpec(filter: Filter):
+  try:
+    args = _SPEC_ARGS[type(filter)](filter)
+  except KeyError:
+    raise TypeError(f"{type(filter).__name__} has no filter spec") from None
+  return FilterSpec(type(filter).__name__, tuple(filterSpec(arg) if isinstance(arg, Filter) else arg for arg in args))
+
+def filterFromSpec(spec: FilterSpec):
+  args = (filterFromSpec(arg) if isinstance(arg, FilterSpec) else arg for arg in spec.args)
+  return _FILTER_CLASSES[spec.kind](*args)
+
+# How long the parent waits on the result queue before checking that its workers are alive
+_POLL_SECONDS = 0.5
+
+# The tree a pool of forked workers searches. Workers inherit it copy-on-write, so it is
+# never pickled; results come back as child index paths from the root.
+_tree = None
+
+def _walkPaths(top: File, top_index, pipeline: FilterPipeline):
+  # Pruned DFS under one top-level child, yielding each match's index path from the root
+  predicate, may_contain = pipeline.predicate, pipeline.may_contain
+  stack = [(top, (top_index,))]
+  while stack:
+    node, path = stack.pop()
+    if not node.is_directory:
+      if predicate(node):
+        yield path
+    elif may_contain(node):
+      children = node.children
+      for i in range(len(children) - 1, -1, -1):
+        stack.append((children[i], path + (i,)))
+
+def _worker(tasks, results, specs, batch_size):
+  pipeline = FilterPipeline([filterFromSpec(spec) for spec in specs])
+  for top_index in iter(tasks.get, None):
+    try:
+      batch = []
+      for path in _walkPaths(_tree.children[top_index], top_index, pipeline):
+        batch.append(path)
+        if len(batch) == batch_size:
+          results.put(("batch", top_index, batch))
+          batch = []
+      results.put(("done", top_index, batch))
+    except Exception as error:
+      results.put(("error", top_index, repr(error)))
+
+def _resolve(root: File, path):
+  node = root
+  for i in path:
+    node = node.children[i]
+  return node
+
+def parallelFind(directory: File, filters: List[Filter], workers: Optional[int] = None, batch_size = 1000,
+                 ordered = False):
+  # Returns an iterator: the directory's top-level children are handed out one at a time
+  # to worker processes, which stream matches back in batches. Unordered, batches are
+  # yielded as they land; ordered, the output is exactly FindCommand.iter_find's DFS order
+  # (a subtree's matches are held back until every earlier subtree has finished).
+  # Arguments are checked here, before the first next(). Needs the fork start method;
+  # elsewhere it falls back to an in-process iter_find.
+  if not directory.is_directory:
+    raise NotADirectory(f"{directory.name} is not a directory")
+  specs = [filterSpec(filter) for filter in filters]
+  if "fork" not in multiprocessing.get_all_start_methods():
+    return FindCommand().iter_find(directory, filters)
+  directory.refreshAggregates()
+  return _parallelFind(directory, specs, workers, batch_size, ordered)
+
+def _nextResult(results, processes):
+  # Waits for the next result, raising instead of hanging if a worker died (killed, or
+  # an error outside the per-subtree handler) and its subtrees will never be reported
+  while True:
+    try:
+      return results.get(timeout = _POLL_SECONDS)
+    except queue.Empty:
+      pass
+    for process in processes:
+      if process.exitcode not in (None, 0):
+        raise RuntimeError(f"find worker {process.pid} exited with code {process.exitcode} before finishing")
+    if all(process.exitcode == 0 for process in processes):
+      # A clean exit flushes the worker's queue first, so anything it sent is readable now
+      try:
+        return results.get(timeout = _POLL_SECONDS)
+      except queue.Empty:
+        raise RuntimeError("find workers exited without reporting every subtree") from None
+
+def _parallelFind(directory: File, specs, workers: Optional[int], batch_size, ordered):
+  global _tree
+  context = multiprocessing.get_context("fork")
+  workers = workers or context.cpu_count()
+  tasks, results = context.Queue(), context.Queue()
+  for top_index in range(len(directory.children)):
+    tasks.put(top_index)
+  for _ in range(workers):
+    tasks.put(None)
+  _tree = directory
+  processes = [context.Process(target = _worker, args = (tasks, results, specs, batch_size), daemon = True)
+               for _ in range(workers)]
+  try:
+    for process in processes:
+      process.start()
+  finally:
+    _tree = None
+
+  try:
+    remaining = len(directory.children)
+    held, finished, next_index = {}, set(), 0
+    while remaining:
+      kind, top_index, payload = _nextResult(results, processes)
+      if kind == "error":
+        raise RuntimeError(f"find worker failed under {directory.children[top_index].name}: {payload}")
+      if kind == "done":
+        remaining -= 1
+        finished.add(top_index)
+      matches = [_resolve(directory, path) for path in payload]
+      if not ordered:
+        yield from matches
+        continue
+      if top_index == next_index:
+        yield from matches
+      else:
+        held.setdefault(top_index, []).extend(matches)
+      while next_index in finished:
+        next_index += 1
+        yield from held.pop(next_index, [])
+  finally:
+    for process in processes:
+      if process.is_alive():
+        process.terminate()
+      process.join()
@@ -0,0 +1,86 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from enum import Enum
+from linux_find import File, FileType
+
+class ScanMode(Enum):
+  SERIAL = "serial"
+  THREADS = "threads"
+  PROCESSES = "processes"
+
+_EXTENSION_TYPES = {
+  ".txt": FileType.TEXT,
+  ".md": FileType.TEXT,
+  ".csv": FileType.TEXT,
+  ".json": FileType.TEXT,
+  ".log": FileType.LOG,
+}
+
+def fileTypeFor(name):
+  # Everything that isn't recognisably text or a log counts as binary
+  return _EXTENSION_TYPES.get(os.path.splitext(name)[1].lower(), FileType.BINARY)
+
+def scanDirectory(path):
+  # One directory's entries as picklable (name, size, mtime, is_directory) tuples. is_dir()
+  # is answered from the d_type scandir already read; only regular files need the stat
+  # for their size and mtime. Symlinks are not followed.
+  entries = []
+  with os.scandir(path) as it:
+    for entry in it:
+      if entry.is_dir(follow_symlinks = False):
+        entries.append((entry.name, 0, 0.0, True))
+      else:
+        stat = entry.stat(follow_symlinks = False)
+        entries.append((entry.name, stat.st_size, stat.st_mtime, False))
+  return entries
+
+def loadTree(path, mode = ScanMode.THREADS, workers = None, onerror = None):
+  # Builds a File tree mirroring the directory at path. Each directory is one scan task;
+  # with THREADS or PROCESSES the scans of sibling subtrees run in a pool while this
+  # thread turns the results into File nodes and queues the subdirectories it finds.
+  # Directories that can't be read are left empty and reported to onerror(OSError).
+  mode = ScanMode(mode)
+  root = File(os.path.basename(os.path.normpath(path)) or path, 0, FileType.DIRECTORY, True)
+
+  def attach(directory, dir_path, entries):
+    subdirs = []
+    for name, size, mtime, is_directory in entries:
+      child = File(name, size, FileType.DIRECTORY if is_directory else fileTypeFor(name), is_directory, mtime = mtime)
+      child.parent = directory
+      directory.children.append(child)
+      if is_directory:
+        subdirs.append((child, os.path.join(dir_path, name)))
+    return subdirs
+
+  if mode is ScanMode.SERIAL:
+    stack = [(root, path)]
+    while stack:
+      directory, dir_path = stack.pop()
+      try:
+        entries = scanDirectory(dir_path)
+      except OSError as error:
+        if onerror:
+          onerror(error)
+        continue
+      stack.extend(attach(directory, dir_path, entries))
+    root.rebuildAggregates()
+    return root
+
+  executor_class = ThreadPoolExecutor if mode is ScanMode.THREADS else ProcessPoolExecutor
+  with executor_class(workers) as executor:
+    pending = {executor.submit(scanDirectory, path): (root, path)}
+    while pending:
+      done, _ = wait(pending, return_when = FIRST_COMPLETED)
+      for future in done:
+        directory, dir_path = pending.pop(future)
+        try:
+          entries = future.result()
+        except OSError as error:
+          if onerror:
+            onerror(error)
+          continue
+        for child, child_path in attach(directory, dir_path, entries):
+          pending[executor.submit(scanDirectory, child_path)] = (child, child_path)
+  # Children were attached directly, so the directory aggregates are built in one pass
+  root.rebuildAggregates()
+  return root
@@ -0,0 +1,266 @@
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from threading import Barrier, Event, Lock, Thread
+from concurrent_file_system import ConcurrentFileSystem
+from disk_store import PersistentFileSystem
+from linux_file_system import FileSystem
+
+class ConcatFile:
+  # The old FileNode content handling: one str grown with +=
+  def __init__(self):
+    self.content = ""
+
+def _timeAppends(append, appends):
+  start = time.perf_counter()
+  for _ in range(appends):
+    append()
+  return time.perf_counter() - start
+
+def appendsBenchmark(args):
+  text, data = "x" * args.chunk, b"x" * args.chunk
+  print(f"{'file MB':>8}{'appends':>10}{'str += secs':>14}{'chunks secs':>14}{'bytes secs':>14}{'full read secs':>16}")
+  for size_mb in args.sizes:
+    appends = size_mb * 2**20 // args.chunk
+    concat = "skipped"
+    if size_mb <= args.concat_max_mb:
+      node = ConcatFile()
+
+      def concatAppend():
+        node.content += text
+      concat = f"{_timeAppends(concatAppend, appends):.2f}"
+
+    fs = FileSystem()
+    chunked = _timeAppends(lambda: fs.addContentToFile("/var/log/app.log", text), appends)
+    binary = _timeAppends(lambda: fs.addContentToFile("/var/log/app.bin", data), appends)
+    start = time.perf_counter()
+    assert len(fs.readContentFromFile("/var/log/app.log")) == appends * args.chunk
+    read = time.perf_counter() - start
+    print(f"{size_mb:>8}{appends:>10,}{concat:>14}{chunked:>14.2f}{binary:>14.2f}{read:>16.2f}")
+
+class GlobalLockFileSystem:
+  # Baseline: one lock around a plain FileSystem
+  def __init__(self):
+    self.fs = FileSystem()
+    self.lock = Lock()
+
+  def mkdir(self, path):
+    with self.lock:
+      return self.fs.mkdir(path)
+
+  def addContentToFile(self, path, content):
+    with self.lock:
+      self.fs.addContentToFile(path, content)
+
+  def readContentFromFile(self, path):
+    with self.lock:
+      return self.fs.readContentFromFile(path)
+
+def _run(workers, seconds):
+  # Starts every worker(stop) together, stops them after seconds. Returns the threads
+  # that didn't finish within 10 seconds of the stop (i.e. are deadlocked)
+  stop = Event()
+  barrier = Barrier(len(workers) + 1)
+
+  def start(worker):
+    barrier.wait()
+    worker(stop)
+
+  threads = [Thread(target = start, args = (worker,), daemon = True) for worker in workers]
+  for thread in threads:
+    thread.start()
+  barrier.wait()
+  time.sleep(seconds)
+  stop.set()
+  deadline = time.monotonic() + 10
+  for thread in threads:
+    thread.join(max(0.0, deadline - time.monotonic()))
+  return [thread for thread in threads if thread.is_alive()]
+
+def stressTest(args):
+  # Writers append to shared and private files while readers read them and a renamer
+  # keeps moving and deleting directories underneath. Afterwards every append must be
+  # there exactly once and no created file may be missing.
+  fs = ConcurrentFileSystem()
+  appended = [[0] * args.shared_files for _ in range(args.writers)]
+  private = [0] * args.writers
+  errors = []
+
+  def writer(w):
+    def work(stop):
+      rng = random.Random(w)
+      while not stop.is_set():
+        f = rng.randrange(args.shared_files)
+        fs.mkdir(f"/shared/d{f % 8}")
+        fs.addContentToFile(f"/shared/d{f % 8}/f{f}.log", "x")
+        appended[w][f] += 1
+        fs.addContentToFile(f"/private/w{w}/n{private[w]}.txt", str(private[w]))
+        private[w] += 1
+    return work
+
+  def reader(r):
+    def work(stop):
+      rng = random.Random(1000 + r)
+      while not stop.is_set():
+        f = rng.randrange(args.shared_files)
+        for path in (f"/shared/d{f % 8}/f{f}.log", f"/swap/a/s{f % 4}/file.txt", f"/swap/b/s{f % 4}/file.txt"):
+          try:
+            content = fs.readContentFromFile(path)
+          except KeyError:
+            continue
+          if content.strip("x"):
+            errors.append(f"corrupt content in {path}")
+    return work
+
+  def renamer(stop):
+    rng = random.Random(99)
+    for s in range(4):
+      fs.addContentToFile(f"/swap/a/s{s}/file.txt", "x")
+    while not stop.is_set():
+      s = rng.randrange(4)
+      src, dst = (f"/swap/a/s{s}", f"/swap/b/s{s}") if rng.random() < 0.5 else (f"/swap/b/s{s}", f"/swap/a/s{s}")
+      fs.mkdir("/swap/b")
+      try:
+        fs.rename(src, dst)
+      except (KeyError, FileExistsError):
+        # Already on the other side
+        pass
+      fs.mkdir(f"/tmp/t{s}/deep")
+      fs.delete(f"/tmp/t{s}")
+
+  workers = [writer(w) for w in range(args.writers)] + [reader(r) for r in range(args.readers)] + [renamer]
+  stuck = _run(workers, args.seconds)
+  if stuck:
+    print(f"FAILED: {len(stuck)} threads still running, probable deadlock")
+    return
+  for f in range(args.shared_files):
+    expected = sum(counts[f] for counts in appended)
+    actual = len(fs.readContentFromFile(f"/shared/d{f % 8}/f{f}.log")) if expected else 0
+    if actual != expected:
+      errors.append(f"/shared/d{f % 8}/f{f}.log has {actual} appends, expected {expected}")
+  for w in range(args.writers):
+    for n in range(private[w]):
+      try:
+        fs.readContentFromFile(f"/private/w{w}/n{n}.txt")
+      except KeyError:
+        errors.append(f"/private/w{w}/n{n}.txt was lost")
+  total = sum(map(sum, appended)) + sum(private)
+  swapped = sum(s in fs.root.children["swap"].children.get(side, FileSystem().root).children for side in "ab" for s in ("s0", "s1", "s2", "s3"))
+  if swapped != 4:
+    errors.append(f"{swapped} of the 4 renamed directories are left")
+  print(f"{total:,} appends by {args.writers} writers next to {args.readers} readers and a renamer: "
+        + ("OK" if not errors else f"{len(errors)} errors"))
+  for error in errors[:10]:
+    print(" ", error)
+
+def throughputBenchmark(args):
+  # Many readers and a few writers; writers either stay in their own subtree (disjoint)
+  # or append to the files the readers read (overlapping)
+  print(f"{'file system':<14}{'writes to':<13}{'readers':>8}{'writers':>8}{'reads/sec':>12}{'writes/sec':>12}")
+  for layout in ("disjoint", "overlapping"):
+    for name, factory in (("global-lock", GlobalLockFileSystem), ("lock-coupling", ConcurrentFileSystem)):
+      fs = factory()
+      for d in range(args.dirs):
+        for f in range(10):
+          fs.addContentToFile(f"/data/d{d}/sub/f{f}.txt", "seed")
+      counts = [0] * (args.readers + args.writers)
+
+      def reader(r):
+        def work(stop):
+          rng = random.Random(r)
+          paths = [f"/data/d{rng.randrange(args.dirs)}/sub/f{rng.randrange(10)}.txt" for _ in range(1000)]
+          while not stop.is_set():
+            for path in paths:
+              fs.readContentFromFile(path)
+            counts[r] += len(paths)
+        return work
+
+      def writer(w):
+        def work(stop):
+          rng = random.Random(1000 + w)
+          i = 0
+          while not stop.is_set():
+            if layout == "disjoint":
+              fs.addContentToFile(f"/writers/w{w}/d{i % 50}/f{i % 7}.log", "x")
+            else:
+              fs.addContentToFile(f"/data/d{rng.randrange(args.dirs)}/sub/f{rng.randrange(10)}.txt", "x")
+            i += 1
+          counts[args.readers + w] = i
+        return work
+
+      stuck = _run([reader(r) for r in range(args.readers)] + [writer(w) for w in range(args.writers)], args.seconds)
+      if stuck:
+        print(f"{name}: {len(stuck)} threads stuck")
+        continue
+      reads, writes = sum(counts[:args.readers]), sum(counts[args.readers:])
+      print(f"{name:<14}{layout:<13}{args.readers:>8}{args.writers:>8}{reads / args.seconds:>12,.0f}{writes / args.seconds:>12,.0f}")
+
+def reopenBenchmark(args):
+  directory = tempfile.mkdtemp(prefix = "fs-store-")
+  try:
+    files_per_dir = max(1, args.nodes // args.dirs)
+    start = time.perf_counter()
+    with PersistentFileSystem(directory, durable = False) as fs:
+      for d in range(args.dirs):
+        for f in range(files_per_dir):
+          fs.addContentToFile(f"/data/d{d}/f{f}.txt", f"payload {d}/{f}")
+      build = time.perf_counter() - start
+      start = time.perf_counter()
+      nodes = fs.checkpoint()
+      checkpoint = time.perf_counter() - start
+    sizes = {name: os.path.getsize(os.path.join(directory, name)) / 2**20 for name in ("meta", "data", "wal")}
+    del fs
+    print(f"{nodes:,} nodes: built in {build:.1f}s, checkpoint {checkpoint:.2f}s, "
+          + ", ".join(f"{name} {size:.1f} MiB" for name, size in sizes.items()))
+
+    start = time.perf_counter()
+    fs = PersistentFileSystem(directory)
+    reopen = time.perf_counter() - start
+    start = time.perf_counter()
+    content = fs.readContentFromFile(f"/data/d{args.dirs // 2}/f{files_per_dir - 1}.txt")
+    first_read = time.perf_counter() - start
+    start = time.perf_counter()
+    for d in range(args.dirs):
+      fs.read(f"/data/d{d}/f0.txt")
+    touch_all = time.perf_counter() - start
+    fs.close()
+    print(f"reopen {reopen * 1000:.1f} ms, first read {first_read * 1000:.1f} ms ({content!r}), "
+          f"one read in each of {args.dirs:,} directories {touch_all:.2f}s")
+  finally:
+    shutil.rmtree(directory)
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description = "FileSystem benchmarks")
+  commands = parser.add_subparsers(dest = "command", required = True)
+
+  appends = commands.add_parser("appends", help = "build files from small appends: str += vs chunked content")
+  appends.add_argument("--sizes", type = int, nargs = "+", default = [1, 4, 8, 100], help = "file sizes in MB")
+  appends.add_argument("--chunk", type = int, default = 1024, help = "bytes per append")
+  appends.add_argument("--concat-max-mb", type = int, default = 8,
+                       help = "largest size to run the quadratic str += baseline for")
+  appends.set_defaults(run = appendsBenchmark)
+
+  reopen = commands.add_parser("reopen", help = "build a persistent store, checkpoint it and time reopening it")
+  reopen.add_argument("--nodes", type = int, default = 1_000_000)
+  reopen.add_argument("--dirs", type = int, default = 1_000)
+  reopen.set_defaults(run = reopenBenchmark)
+
+  stress = commands.add_parser("stress", help = "check ConcurrentFileSystem for lost updates and deadlocks")
+  stress.add_argument("--writers", type = int, default = 4)
+  stress.add_argument("--readers", type = int, default = 8)
+  stress.add_argument("--shared-files", type = int, default = 32)
+  stress.add_argument("--seconds", type = float, default = 5.0)
+  stress.set_defaults(run = stressTest)
+
+  throughput = commands.add_parser("throughput", help = "many readers, a few writers: lock coupling vs one global lock")
+  throughput.add_argument("--readers", type = int, default = 16)
+  throughput.add_argument("--writers", type = int, default = 2)
+  throughput.add_argument("--dirs", type = int, default = 100)
+  throughput.add_argument("--seconds", type = float, default = 3.0)
+  throughput.set_defaults(run = throughputBenchmark)
+
+  args = parser.parse_args()
+  args.run(args)
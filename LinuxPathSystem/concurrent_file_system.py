@@ -0,0 +1,228 @@
+from threading import Condition, Lock
+from linux_file_system import FileNode, FileSystem
+
+class ReadWriteLock:
+  # Many readers or one writer. A waiting writer holds off new readers, so a steady
+  # stream of readers can't starve it.
+  def __init__(self):
+    self._cond = Condition(Lock())
+    self._readers = 0
+    self._writer = False
+    self._waiting_writers = 0
+
+  def acquireRead(self):
+    with self._cond:
+      while self._writer or self._waiting_writers:
+        self._cond.wait()
+      self._readers += 1
+
+  def releaseRead(self):
+    with self._cond:
+      self._readers -= 1
+      if not self._readers:
+        self._cond.notify_all()
+
+  def acquireWrite(self):
+    with self._cond:
+      self._waiting_writers += 1
+      while self._writer or self._readers:
+        self._cond.wait()
+      self._waiting_writers -= 1
+      self._writer = True
+
+  def releaseWrite(self):
+    with self._cond:
+      self._writer = False
+      self._cond.notify_all()
+
+  def downgrade(self):
+    # Write -> read without letting another writer in between
+    with self._cond:
+      self._writer = False
+      self._readers += 1
+      self._cond.notify_all()
+
+class LockedNode(FileNode):
+  def __init__(self, is_file = False, binary = False):
+    super().__init__(is_file, binary)
+    self.lock = ReadWriteLock()
+
+class ConcurrentFileSystem(FileSystem):
+  # FileSystem that is safe to share between threads, using lock coupling on per-node
+  # read/write locks. A walk read-locks each node on the path hand over hand, holding
+  # at most a node and its parent. Holding the parent keeps the node linked, because
+  # unlinking a child (delete, rename) needs its directory write-locked.
+  # 1. a missing component is created under a brief write lock on its directory, then
+  #    downgraded so the walk continues
+  # 2. file reads hold the file's read lock, appends its write lock
+  # 3. rename write-locks the deepest common directory of source and destination before
+  #    it touches either parent, so two renames can't lock in opposite orders
+  # The path cache is off: a cached node would skip the locks on its path.
+  node_class = LockedNode
+
+  def __init__(self):
+    super().__init__(cache_size = 0)
+
+  def _cached(self, path):
+    return None
+
+  def _remember(self, path, parts, node):
+    pass
+
+  def _walk(self, parts, create = False, binary = None, start = None, held = None):
+    # Walks parts from start (default: the root, read-locked here) and returns the last
+    # node read-locked with every lock taken appended to held. The caller releases held
+    # in reverse. With create, missing directories are made, and the last component is
+    # made as a file when binary isn't None. Raises KeyError for a missing component.
+    held = [] if held is None else held
+    node = start
+    if node is None:
+      node = self.root
+      node.lock.acquireRead()
+      held.append((node, False))
+    for i, part in enumerate(parts):
+      child = node.children.get(part)
+      if child is None:
+        if not create:
+          raise KeyError(part)
+        upgraded = held[-1][0] is node and not held[-1][1]
+        if upgraded:
+          node.lock.releaseRead()
+          node.lock.acquireWrite()
+        child = node.children.get(part)
+        if child is None:
+          is_file = binary is not None and i == len(parts) - 1
+          child = node.children[part] = LockedNode(is_file, bool(binary) and is_file)
+        if upgraded:
+          node.lock.downgrade()
+      child.lock.acquireRead()
+      held.append((child, False))
+      # Hand over hand: only the new node and its parent stay locked. Write locks held
+      # further up (a rename's common directory) are kept.
+      if len(held) >= 3 and not held[-3][1]:
+        held.pop(-3)[0].lock.releaseRead()
+      node = child
+    return node
+
+  @staticmethod
+  def _release(held):
+    for node, exclusive in reversed(held):
+      if exclusive:
+        node.lock.releaseWrite()
+      else:
+        node.lock.releaseRead()
+
+  @staticmethod
+  def _upgrade(held):
+    # Read lock on the last walked node -> write lock. Its parent is still read-locked,
+    # so it can't be unlinked while the lock is briefly dropped.
+    node = held[-1][0]
+    node.lock.releaseRead()
+    node.lock.acquireWrite()
+    held[-1] = (node, True)
+    return node
+
+  def mkdir(self, path: str):
+    held = []
+    try:
+      self._walk(self._split(path), create = True, held = held)
+    finally:
+      self._release(held)
+    return f"Directory {path} created"
+
+  def addContentToFile(self, file_path: str, content: str):
+    held = []
+    try:
+      self._walk(self._split(file_path), create = True, binary = not isinstance(content, str), held = held)
+      self._upgrade(held).append(content)
+    finally:
+      self._release(held)
+
+  def readContentFromFile(self, filePath: str):
+    held = []
+    try:
+      node = self._walk(self._split(filePath), held = held)
+      if len(node.chunks) > 1:
+        # Reading joins the chunks in place, which is a write
+        self._upgrade(held)
+      return node.content
+    finally:
+      self._release(held)
+
+  def read(self, path: str, offset = 0, length = None):
+    held = []
+    try:
+      return self._walk(self._split(path), held = held).read(offset, length)
+    finally:
+      self._release(held)
+
+  def delete(self, path: str):
+    parts = self._split(path)
+    if not parts:
+      raise ValueError("can't delete the root directory")
+    held = []
+    try:
+      self._walk(parts[:-1], held = held)
+      del self._upgrade(held).children[parts[-1]]
+    finally:
+      self._release(held)
+    return f"{path} deleted"
+
+  def rename(self, src: str, dst: str):
+    src_parts, dst_parts = self._split(src), self._split(dst)
+    if not src_parts or not dst_parts:
+      raise ValueError("can't rename the root directory")
+    if src_parts == dst_parts[:len(src_parts)]:
+      raise ValueError(f"can't move {src} into itself")
+    src_dirs, dst_dirs = src_parts[:-1], dst_parts[:-1]
+    common = 0
+    while common < min(len(src_dirs), len(dst_dirs)) and src_dirs[common] == dst_dirs[common]:
+      common += 1
+
+    held = []
+    try:
+      # Deepest common directory first, write-locked for the whole move: nothing new
+      # can enter its subtree, so below it the two parents can be locked in any order
+      ancestor = self._walk(src_dirs[:common], held = held)
+      self._upgrade(held)
+      parents = []
+      for dirs in (src_dirs, dst_dirs):
+        if len(dirs) == common:
+          parents.append(ancestor)
+        else:
+          # Separate list, so hand over hand below the common directory never
+          # releases what is held above it
+          branch = []
+          try:
+            self._walk(dirs[common:], start = ancestor, held = branch)
+          finally:
+            held.extend(branch)
+          parents.append(self._upgrade(held))
+      src_parent, dst_parent = parents
+      if dst_parts[-1] in dst_parent.children:
+        raise FileExistsError(dst)
+      dst_parent.children[dst_parts[-1]] = src_parent.children.pop(src_parts[-1])
+    finally:
+      self._release(held)
+    return f"{src} renamed to {dst}"
+
+if __name__ == "__main__":
+  from threading import Thread
+
+  fs = ConcurrentFileSystem()
+
+  def writer(worker):
+    for i in range(200):
+      fs.mkdir(f"/shared/dir{i % 10}")
+      fs.addContentToFile(f"/shared/dir{i % 10}/log.txt", "x")
+      fs.addContentToFile(f"/private/{worker}/{i}.txt", str(i))
+
+  threads = [Thread(target = writer, args = (w,)) for w in range(8)]
+  for thread in threads:
+    thread.start()
+  for thread in threads:
+    thread.join()
+  print(sum(len(fs.readContentFromFile(f"/shared/dir{d}/log.txt")) for d in range(10)))  # 1600, no lost appends
+  print(len(fs.root.children["private"].children))  # 8
+  fs.rename("/private/0", "/shared/dir0/moved")
+  print(fs.readContentFromFile("/shared/dir0/moved/7.txt"))  # 7
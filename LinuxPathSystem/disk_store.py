@@ -0,0 +1,315 @@
+import mmap
+import os
+import struct
+import sys
+import zlib
+from linux_file_system import FileNode, FileSystem
+
+# A store is a directory holding three files (little endian throughout):
+#   meta  checkpoint of the directory trie: header, then one record per directory and per
+#         file, children before their parent so every record can point at finished ones
+#   data  append-only file contents; a file is a list of (offset, length) extents into it
+#   wal   operations since the last checkpoint, replayed on open
+# meta and wal carry a generation. A checkpoint writes meta with the next generation before
+# restarting the wal, so a wal left over from a crash in between is recognised as stale.
+_META_MAGIC = b"FSMT"
+_WAL_MAGIC = b"FSWL"
+_VERSION = 1
+_META_HEADER = struct.Struct("<4sHHQQQ")  # magic, version, reserved, root record offset, node count, generation
+_WAL_HEADER = struct.Struct("<4sHHQ")     # magic, version, reserved, generation
+_COUNT = struct.Struct("<I")              # children in a directory record / extents in a file record
+_ENTRY = struct.Struct("<HBQ")            # child name length, kind, record offset (name bytes follow)
+_EXTENT = struct.Struct("<QI")            # data file offset, length
+_WAL_RECORD = struct.Struct("<BII")       # op, payload length, crc32 of the payload
+_APPEND = struct.Struct("<QIB")           # data file offset, length, binary (path follows)
+
+_DIRECTORY, _TEXT, _BINARY = 0, 1, 2
+_MKDIR, _APPEND_CONTENT, _RENAME, _DELETE = 1, 2, 3, 4
+
+class _MetaReader:
+  # Parses records out of the mmapped meta file on demand
+  def __init__(self, path):
+    with open(path, "rb") as f:
+      self.map = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+    magic, version, _, self.root_offset, self.node_count, self.generation = _META_HEADER.unpack_from(self.map)
+    if magic != _META_MAGIC or version != _VERSION:
+      raise ValueError(f"{path} is not a file system store")
+
+  def children(self, offset):
+    buf = self.map
+    (count,) = _COUNT.unpack_from(buf, offset)
+    pos = offset + _COUNT.size
+    children = {}
+    for _ in range(count):
+      name_length, kind, pointer = _ENTRY.unpack_from(buf, pos)
+      pos += _ENTRY.size
+      name = sys.intern(str(buf[pos:pos + name_length], "utf-8"))
+      pos += name_length
+      children[name] = StoredNode(kind != _DIRECTORY, kind == _BINARY, self, pointer)
+    return children
+
+  def extents(self, offset):
+    (count,) = _COUNT.unpack_from(self.map, offset)
+    return [_EXTENT.unpack_from(self.map, offset + _COUNT.size + i * _EXTENT.size) for i in range(count)]
+
+class StoredNode(FileNode):
+  # Node of a PersistentFileSystem. A directory loaded from meta parses its children on
+  # first access, so opening a store reads nothing but the header. A file's content is
+  # its extents in the data file.
+  def __init__(self, is_file = False, binary = False, meta = None, offset = None):
+    self.is_file = is_file
+    self.binary = binary
+    self._meta = meta
+    self._offset = offset
+    self._children = None if meta is not None and not is_file else {}
+    self._extents = None if meta is not None and is_file else []
+
+  @property
+  def children(self):
+    if self._children is None:
+      self._children = self._meta.children(self._offset)
+    return self._children
+
+  @property
+  def extents(self):
+    if self._extents is None:
+      self._extents = self._meta.extents(self._offset)
+    return self._extents
+
+  @property
+  def size(self):
+    return sum(length for _, length in self.extents)
+
+class PersistentFileSystem(FileSystem):
+  # FileSystem whose tree and contents live in a store directory. Every change is logged
+  # to the wal before the call returns (and fsynced with durable=True); checkpoint()
+  # folds the log into a new meta file. That happens on its own once the wal grows past
+  # checkpoint_bytes (None turns it off) and in close(), so a reopen replays at most
+  # that much. Contents are bytes on disk: str content is stored as UTF-8, and read()
+  # offsets count bytes.
+  node_class = StoredNode
+
+  def __init__(self, directory, durable = True, cache_size = 4096, checkpoint_bytes = 64 << 20):
+    super().__init__(cache_size)
+    os.makedirs(directory, exist_ok = True)
+    self.directory = directory
+    self.durable = durable
+    self.checkpoint_bytes = checkpoint_bytes
+    self.meta_path = os.path.join(directory, "meta")
+    self.data_path = os.path.join(directory, "data")
+    self.wal_path = os.path.join(directory, "wal")
+    self.generation = 0
+    if os.path.exists(self.meta_path):
+      meta = _MetaReader(self.meta_path)
+      self.root = StoredNode(False, False, meta, meta.root_offset)
+      self.generation = meta.generation
+    self._data = open(self.data_path, "a+b", buffering = 0)
+    self._data_size = os.fstat(self._data.fileno()).st_size
+    self._map = None
+    self._replaying = True
+    self._replay()
+    self._replaying = False
+
+  # Write-ahead log
+  def _log(self, op, payload):
+    if self._replaying:
+      return
+    record = _WAL_RECORD.pack(op, len(payload), zlib.crc32(payload)) + payload
+    self._wal.write(record)
+    if self.durable:
+      os.fsync(self._wal.fileno())
+    self._wal_size += len(record)
+    if self.checkpoint_bytes is not None and self._wal_size >= self.checkpoint_bytes:
+      self.checkpoint()
+
+  def _replay(self):
+    # Applies the wal's records; a torn record at the tail (crash mid-write) and
+    # everything after it is cut off. A wal from an older generation is discarded.
+    valid_end = 0
+    if os.path.exists(self.wal_path):
+      with open(self.wal_path, "rb") as f:
+        log = f.read()
+      if len(log) >= _WAL_HEADER.size:
+        magic, version, _, generation = _WAL_HEADER.unpack_from(log)
+        if magic == _WAL_MAGIC and version == _VERSION and generation == self.generation:
+          pos = valid_end = _WAL_HEADER.size
+          while pos + _WAL_RECORD.size <= len(log):
+            op, length, crc = _WAL_RECORD.unpack_from(log, pos)
+            payload = log[pos + _WAL_RECORD.size:pos + _WAL_RECORD.size + length]
+            if len(payload) != length or zlib.crc32(payload) != crc:
+              break
+            self._apply(op, payload)
+            pos = valid_end = pos + _WAL_RECORD.size + length
+    if valid_end:
+      self._wal = open(self.wal_path, "r+b", buffering = 0)
+      self._wal.truncate(valid_end)
+      self._wal.seek(valid_end)
+      self._wal_size = valid_end
+    else:
+      self._resetWal()
+
+  def _resetWal(self):
+    with open(f"{self.wal_path}.tmp", "wb") as f:
+      f.write(_WAL_HEADER.pack(_WAL_MAGIC, _VERSION, 0, self.generation))
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(f"{self.wal_path}.tmp", self.wal_path)
+    self._wal = open(self.wal_path, "ab", buffering = 0)
+    self._wal_size = _WAL_HEADER.size
+
+  def _apply(self, op, payload):
+    if op == _MKDIR:
+      self.mkdir(payload.decode())
+    elif op == _APPEND_CONTENT:
+      offset, length, binary = _APPEND.unpack_from(payload)
+      file_node = self._fileNode(payload[_APPEND.size:].decode(), bool(binary))
+      if length:
+        file_node.extents.append((offset, length))
+    elif op == _RENAME:
+      src, dst = payload.decode().split("\0")
+      self.rename(src, dst)
+    elif op == _DELETE:
+      self.delete(payload.decode())
+
+  # Operations
+  def mkdir(self, path: str):
+    result = super().mkdir(path)
+    self._log(_MKDIR, path.encode())
+    return result
+
+  def addContentToFile(self, file_path: str, content):
+    binary = not isinstance(content, str)
+    data = bytes(content) if binary else content.encode()
+    file_node = self._fileNode(file_path, binary)
+    if file_node.binary != binary:
+      raise TypeError(f"{'bytes' if file_node.binary else 'str'} file can't take {type(content).__name__} content")
+    offset = self._data_size
+    if data:
+      self._data.write(data)
+      self._data_size += len(data)
+      if self.durable:
+        os.fsync(self._data.fileno())
+      file_node.extents.append((offset, len(data)))
+    self._log(_APPEND_CONTENT, _APPEND.pack(offset, len(data), binary) + file_path.encode())
+
+  def rename(self, src: str, dst: str):
+    result = super().rename(src, dst)
+    self._log(_RENAME, f"{src}\0{dst}".encode())
+    return result
+
+  def delete(self, path: str):
+    result = super().delete(path)
+    self._log(_DELETE, path.encode())
+    return result
+
+  # Reads
+  def _view(self, end):
+    # The data file mmapped at least up to end. Remapping drops the old map without
+    # closing it, so memoryviews handed out earlier stay valid.
+    if self._map is None or len(self._map) < end:
+      self._map = mmap.mmap(self._data.fileno(), 0, access = mmap.ACCESS_READ)
+    return memoryview(self._map)
+
+  def read(self, path: str, offset = 0, length = None):
+    # memoryview of length bytes from offset. A range inside one extent (e.g. a file
+    # written in one append) is a zero-copy slice of the mmapped data file; a range
+    # spanning several extents is joined into a new buffer.
+    extents = self._resolve(path).extents
+    size = sum(extent_length for _, extent_length in extents)
+    end = size if length is None else min(size, offset + length)
+    pieces, start = [], 0
+    for extent_offset, extent_length in extents:
+      if start + extent_length > offset and start < end:
+        lo, hi = max(offset - start, 0), min(end - start, extent_length)
+        pieces.append((extent_offset + lo, extent_offset + hi))
+      start += extent_length
+      if start >= end:
+        break
+    if not pieces:
+      return memoryview(b"")
+    view = self._view(pieces[-1][1])
+    if len(pieces) == 1:
+      return view[pieces[0][0]:pieces[0][1]]
+    return memoryview(b"".join(view[lo:hi] for lo, hi in pieces))
+
+  def readContentFromFile(self, filePath: str):
+    node = self._resolve(filePath)
+    data = self.read(filePath)
+    return bytes(data) if node.binary else str(data, "utf-8")
+
+  # Checkpoint
+  def checkpoint(self):
+    # Writes the whole trie to a new meta file (loading any directory not yet parsed),
+    # then restarts the wal. The data file is only ever appended to; space held by
+    # deleted files is not reclaimed.
+    generation = self.generation + 1
+    out = bytearray(_META_HEADER.size)
+    node_count = 1
+    # Iterative post-order walk: a directory's record is written once all its children are
+    stack = [(None, self.root, iter(list(self.root.children.items())), [])]
+    while stack:
+      _, node, pending, entries = stack[-1]
+      for name, child in pending:
+        node_count += 1
+        if child.is_file:
+          offset = len(out)
+          out += _COUNT.pack(len(child.extents))
+          for extent in child.extents:
+            out += _EXTENT.pack(*extent)
+          entries.append((name, _BINARY if child.binary else _TEXT, offset))
+        else:
+          stack.append((name, child, iter(list(child.children.items())), []))
+          break
+      else:
+        name, node, _, entries = stack.pop()
+        offset = len(out)
+        out += _COUNT.pack(len(entries))
+        for child_name, kind, pointer in entries:
+          encoded = child_name.encode()
+          out += _ENTRY.pack(len(encoded), kind, pointer) + encoded
+        if stack:
+          stack[-1][3].append((name, _DIRECTORY, offset))
+        else:
+          root_offset = offset
+    _META_HEADER.pack_into(out, 0, _META_MAGIC, _VERSION, 0, root_offset, node_count, generation)
+
+    tmp_path = f"{self.meta_path}.tmp"
+    with open(tmp_path, "wb") as f:
+      f.write(out)
+      f.flush()
+      os.fsync(f.fileno())
+    os.replace(tmp_path, self.meta_path)
+    self.generation = generation
+    self._wal.close()
+    self._resetWal()
+    return node_count
+
+  def close(self, checkpoint = True):
+    # Checkpoints first if anything was logged since the last one, so the next open
+    # doesn't replay it. On a big store that loads every directory not yet parsed.
+    if checkpoint and self._wal_size > _WAL_HEADER.size:
+      self.checkpoint()
+    self._wal.close()
+    self._data.close()
+    self._map = None
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+if __name__ == "__main__":
+  import tempfile
+  store = tempfile.mkdtemp()
+  with PersistentFileSystem(store) as fs:
+    fs.mkdir("/a/b/c")
+    fs.addContentToFile("/a/b/c/d.txt", "Hello")
+    fs.addContentToFile("/var/log/app.log", "one\n")
+    fs.checkpoint()
+    fs.addContentToFile("/var/log/app.log", "two\n")   # in the wal until close() checkpoints
+    fs.addContentToFile("/bin/tool", b"\x7fELF")
+  with PersistentFileSystem(store) as fs:
+    print(fs.readContentFromFile("/a/b/c/d.txt"), repr(fs.readContentFromFile("/var/log/app.log")))  # Hello 'one\ntwo\n'
+    view = fs.read("/bin/tool", 1)
+    print(type(view).__name__, bytes(view))  # memoryview b'ELF'
@@ -1,51 +1,194 @@
+import sys
+from bisect import bisect_right
+from collections import OrderedDict
+
 class FileNode:
-  def __init__(self, is_file = False):
+  # File content is an append log: a list of chunks plus the running end offset of
+  # each, so an append never copies what is already there. Reading the whole content
+  # joins the chunks once and keeps the joined result as the only chunk; range reads
+  # bisect to the first chunk they touch. Content is str, or bytes for binary files.
+  def __init__(self, is_file = False, binary = False):
     self.is_file = is_file
     self.children = {}
-    self.content = ""
+    self.binary = binary
+    self.chunks = []
+    self.ends = []
+
+  @property
+  def size(self):
+    return self.ends[-1] if self.ends else 0
+
+  def append(self, data):
+    if isinstance(data, str) == self.binary:
+      raise TypeError(f"{'bytes' if self.binary else 'str'} file can't take {type(data).__name__} content")
+    if data:
+      self.chunks.append(bytes(data) if self.binary else data)
+      self.ends.append(self.size + len(data))
+
+  @property
+  def content(self):
+    if len(self.chunks) > 1:
+      self.chunks = [(b"" if self.binary else "").join(self.chunks)]
+      self.ends = [self.size]
+    return self.chunks[0] if self.chunks else (b"" if self.binary else "")
+
+  @content.setter
+  def content(self, data):
+    self.chunks, self.ends = [], []
+    self.append(data)
+
+  def read(self, offset = 0, length = None):
+    end = self.size if length is None else min(self.size, offset + length)
+    if offset >= end:
+      return b"" if self.binary else ""
+    i = bisect_right(self.ends, offset)
+    start = self.ends[i - 1] if i else 0
+    pieces = []
+    while start < end:
+      chunk = self.chunks[i]
+      pieces.append(chunk[max(0, offset - start):end - start])
+      start = self.ends[i]
+      i += 1
+    return pieces[0] if len(pieces) == 1 else (b"" if self.binary else "").join(pieces)
 
 class FileSystem:
-  def __init__(self):
-    self.root = FileNode()
+  # Node type for new files and directories; disk_store swaps in its own
+  node_class = FileNode
+
+  def __init__(self, cache_size = 4096):
+    self.root = self.node_class()
+    # Path string -> (FileNode, normalized path), least recently used first. Only paths
+    # that exist are cached, so creating nodes never makes an entry stale; rename and
+    # delete drop the entries at or below the path they change.
+    self.cache_size = cache_size
+    self._cache = OrderedDict()
+
+  def _split(self, path: str):
+    # Components are interned, so the children dicts share one string per distinct name
+    # and lookups compare by identity
+    return [sys.intern(p) for p in path.split('/') if p]
+
+  def _cached(self, path: str):
+    entry = self._cache.get(path)
+    if entry is None:
+      return None
+    self._cache.move_to_end(path)
+    return entry[0]
+
+  def _remember(self, path: str, parts, node: FileNode):
+    self._cache[path] = (node, '/' + '/'.join(parts))
+    if len(self._cache) > self.cache_size:
+      self._cache.popitem(last = False)
+
+  def _invalidate(self, parts):
+    prefix = '/' + '/'.join(parts)
+    below = prefix + '/'
+    stale = [path for path, (_, normalized) in self._cache.items() if normalized == prefix or normalized.startswith(below)]
+    for path in stale:
+      del self._cache[path]
 
   def _traverse(self, path: str) -> FileNode:
-    parts = [p for p in path.split('/') if p]
+    parts = self._split(path)
     curr: FileNode = self.root
     for part in parts:
       if part not in curr.children:
-        curr.children[part] = FileNode()
+        curr.children[part] = self.node_class()
       curr = curr.children[part]
     return curr
-  
+
+  def _resolve(self, path: str) -> FileNode:
+    # Existing node at path (KeyError if there is none), through the cache
+    node = self._cached(path)
+    if node is None:
+      parts = self._split(path)
+      node = self.root
+      for part in parts:
+        node = node.children[part]
+      self._remember(path, parts, node)
+    return node
+
   def mkdir(self, path: str):
     self._traverse(path)
     return f"Directory {path} created"
-  
+
   def addContentToFile(self, file_path: str, content: str):
-    parts =  file_path.split('/')
-    *dirs, file_name = [p for p in parts if p]
-    dir_path = '/' + '/'.join(dirs)
+    self._fileNode(file_path, not isinstance(content, str)).append(content)
 
-    parent = self._traverse(dir_path)
-    if file_name not in parent.children:
-      parent.children[file_name] = FileNode(is_file = True)
+  def _fileNode(self, file_path: str, binary: bool) -> FileNode:
+    # The file at file_path, created along with any missing directories
+    file_node = self._cached(file_path)
+    if file_node is None:
+      *dirs, file_name = parts = self._split(file_path)
+      parent = self.root
+      for part in dirs:
+        if part not in parent.children:
+          parent.children[part] = self.node_class()
+        parent = parent.children[part]
+      if file_name not in parent.children:
+        parent.children[file_name] = self.node_class(is_file = True, binary = binary)
+      file_node = parent.children[file_name]
+      self._remember(file_path, parts, file_node)
+    return file_node
 
-    file_node: FileNode = parent.children[file_name]
-    file_node.content += content
-  
   def readContentFromFile(self, filePath: str):
-    parts = [p for p in filePath.split('/') if p]
-    curr = self.root
-    for part in parts:
-      curr = curr.children[part]
-    return curr.content
+    return self._resolve(filePath).content
+
+  def read(self, path: str, offset = 0, length = None):
+    # length characters (bytes for a binary file) from offset, without joining the file
+    return self._resolve(path).read(offset, length)
+
+  def rename(self, src: str, dst: str):
+    # Moves the file or directory at src to dst. dst's parent has to exist and dst must not.
+    src_parts, dst_parts = self._split(src), self._split(dst)
+    if not src_parts or not dst_parts:
+      raise ValueError("can't rename the root directory")
+    *src_dirs, src_name = src_parts
+    *dst_dirs, dst_name = dst_parts
+    if src_parts == dst_parts[:len(src_parts)]:
+      raise ValueError(f"can't move {src} into itself")
+    src_parent = self._resolve('/' + '/'.join(src_dirs))
+    dst_parent = self._resolve('/' + '/'.join(dst_dirs))
+    if dst_name in dst_parent.children:
+      raise FileExistsError(dst)
+    node = src_parent.children.pop(src_name)
+    dst_parent.children[dst_name] = node
+    self._invalidate(src_parts)
+    return f"{src} renamed to {dst}"
+
+  def delete(self, path: str):
+    # Removes the file or directory (with everything under it) at path
+    parts = self._split(path)
+    if not parts:
+      raise ValueError("can't delete the root directory")
+    *dirs, name = parts
+    parent = self._resolve('/' + '/'.join(dirs))
+    del parent.children[name]
+    self._invalidate(parts)
+    return f"{path} deleted"
+
+if __name__ == "__main__":
+  fs = FileSystem()
+
+  fs.mkdir("/a/b/c")
 
-fs = FileSystem()
+  fs.addContentToFile("/a/b/c/d.txt", "Hello")
+  print(fs.readContentFromFile("/a/b/c/d.txt"))
 
-fs.mkdir("/a/b/c")
+  fs.addContentToFile("/a/b/c/e/k.txt", "World")
+  print(fs.readContentFromFile("/a/b/c/e/k.txt"))
 
-fs.addContentToFile("/a/b/c/d.txt", "Hello")
-print(fs.readContentFromFile("/a/b/c/d.txt"))
+  fs.rename("/a/b/c", "/a/x")
+  print(fs.readContentFromFile("/a/x/e/k.txt"))
+  try:
+    fs.readContentFromFile("/a/b/c/e/k.txt")
+  except KeyError:
+    print("/a/b/c/e/k.txt is gone")
+  fs.delete("/a/x/d.txt")
+  print(sorted(fs._resolve("/a/x").children))  # ['e']
 
-fs.addContentToFile("/a/b/c/e/k.txt", "World")
-print(fs.readContentFromFile("/a/b/c/e/k.txt"))
\ No newline at end of file
+  for line in range(5):
+    fs.addContentToFile("/var/log/app.log", f"line {line}\n")
+  print(repr(fs.read("/var/log/app.log", 5, 10)))  # '0\nline 1\nl'
+  fs.addContentToFile("/bin/tool", b"\x7fELF")
+  fs.addContentToFile("/bin/tool", b"\x02\x01")
+  print(fs.read("/bin/tool", 1, 3), fs.readContentFromFile("/bin/tool"))  # b'ELF' b'\x7fELF\x02\x01'
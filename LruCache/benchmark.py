@@ -0,0 +1,125 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+from threading import Barrier, Thread
+from eviction_policies import EvictionPolicy, createCache
+from lru_cache import LRU, ShardedLRU
+
+def _runThreads(cache, threads, ops, read_ratio, key_space):
+  barrier = Barrier(threads + 1)
+
+  def work(seed):
+    rng = random.Random(seed)
+    plan = [(rng.random() < read_ratio, rng.randrange(key_space)) for _ in range(ops)]
+    get, put = cache.get, cache.put
+    barrier.wait()
+    for is_read, key in plan:
+      if is_read:
+        get(key)
+      else:
+        put(key, key)
+
+  workers = [Thread(target = work, args = (seed,)) for seed in range(threads)]
+  for worker in workers:
+    worker.start()
+  barrier.wait()
+  start = time.perf_counter()
+  for worker in workers:
+    worker.join()
+  return threads * ops / (time.perf_counter() - start)
+
+def shardedBenchmark(args):
+  caches = (("LRU", LRU(args.capacity)), (f"ShardedLRU/{args.shards}", ShardedLRU(args.capacity, args.shards)))
+  print(f"{'cache':<16}{'threads':>8}{'ops/sec':>14}")
+  for threads in args.threads:
+    for name, cache in caches:
+      for key in range(args.capacity):
+        cache.put(key, key)
+      throughput = _runThreads(cache, threads, args.ops, args.read_ratio, args.key_space)
+      print(f"{name:<16}{threads:>8}{throughput:>14,.0f}")
+
+def _loadTrace(path):
+  with open(path) as f:
+    return [line.strip() for line in f if line.strip()]
+
+def _syntheticTrace(length, key_space, seed = 7):
+  # Zipf-like hot set with a full key space scan dropped in every length / 4 accesses
+  rng = random.Random(seed)
+  weights = [1 / (rank + 1) for rank in range(key_space // 10)]
+  hot = rng.choices(range(key_space // 10), weights = weights, k = length)
+  trace = []
+  for i, key in enumerate(hot):
+    trace.append(key)
+    if i % (length // 4) == length // 8:
+      trace.extend(range(key_space, 2 * key_space))
+  return trace
+
+def policiesBenchmark(args):
+  trace = _loadTrace(args.trace) if args.trace else _syntheticTrace(args.length, args.key_space)
+  print(f"replaying {len(trace):,} accesses, capacity {args.capacity:,}")
+  print(f"{'policy':<12}{'hit ratio':>10}{'ops/sec':>14}")
+  for policy in args.policies:
+    cache = createCache(args.capacity, policy)
+    get, put = cache.get, cache.put
+    start = time.perf_counter()
+    for key in trace:
+      if get(key) == -1:
+        put(key, True)
+    elapsed = time.perf_counter() - start
+    stats = cache.stats()
+    print(f"{policy.value:<12}{stats['hits'] / len(trace):>10.2%}{len(trace) / elapsed:>14,.0f}")
+
+def warmStartBenchmark(args):
+  # Dump a full cache of small string values, then time loading it into a cold one
+  path = os.path.join(tempfile.mkdtemp(), "warm.lru")
+  source = LRU(args.entries, default_ttl = 3600 if args.ttl else None)
+  for key in range(args.entries):
+    source.put(key, f"value-{key}")
+  start = time.perf_counter()
+  source.dump(path)
+  dump_secs = time.perf_counter() - start
+  size = os.path.getsize(path)
+  del source
+
+  print(f"{'limit':>12}{'loaded':>12}{'load secs':>12}{'entries/sec':>14}")
+  for limit in args.limits or [None]:
+    target = LRU(args.entries, default_ttl = 3600 if args.ttl else None)
+    start = time.perf_counter()
+    loaded = target.load(path, limit = limit, batch_size = args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"{'all' if limit is None else limit:>12}{loaded:>12,}{elapsed:>12.2f}{loaded / elapsed:>14,.0f}")
+  print(f"dump {dump_secs:.2f}s, snapshot {size / 2**20:.1f} MiB ({size / args.entries:.1f} bytes/entry)")
+  os.remove(path)
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description = "LRU cache benchmarks")
+  commands = parser.add_subparsers(dest = "command", required = True)
+
+  sharded = commands.add_parser("sharded", help = "ShardedLRU vs the single lock LRU as threads grow")
+  sharded.add_argument("--threads", type = int, nargs = "+", default = [1, 2, 4, 8, 16])
+  sharded.add_argument("--ops", type = int, default = 100_000, help = "operations per thread")
+  sharded.add_argument("--read-ratio", type = float, default = 0.9)
+  sharded.add_argument("--capacity", type = int, default = 10_000)
+  sharded.add_argument("--key-space", type = int, default = 20_000)
+  sharded.add_argument("--shards", type = int, default = 16)
+  sharded.set_defaults(run = shardedBenchmark)
+
+  policies = commands.add_parser("policies", help = "replay an access log against each eviction policy")
+  policies.add_argument("--trace", help = "access log, one key per line (default: synthetic hot set + scans)")
+  policies.add_argument("--policies", type = EvictionPolicy, nargs = "+", default = list(EvictionPolicy))
+  policies.add_argument("--capacity", type = int, default = 1_000)
+  policies.add_argument("--length", type = int, default = 200_000, help = "synthetic trace length")
+  policies.add_argument("--key-space", type = int, default = 20_000, help = "synthetic trace key space")
+  policies.set_defaults(run = policiesBenchmark)
+
+  warm = commands.add_parser("warm-start", help = "dump a full cache and time reloading the snapshot")
+  warm.add_argument("--entries", type = int, default = 1_000_000)
+  warm.add_argument("--limits", type = int, nargs = "*", help = "also time partial loads of this many entries")
+  warm.add_argument("--batch-size", type = int, default = 1000, help = "entries restored per lock acquisition")
+  warm.add_argument("--ttl", action = "store_true", help = "give every entry a TTL (exercises the timer wheel)")
+  warm.set_defaults(run = warmStartBenchmark)
+
+  args = parser.parse_args()
+  args.run(args)
@@ -0,0 +1,317 @@
+import sys
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from enum import Enum
+from threading import Lock
+from lru_cache import LRU, CacheRegistry
+
+_MISSING = object()
+
+class PolicyCache(ABC):
+  # Shared shell for the scan resistant policies: same get/put/stats interface as LRU
+  # (get returns -1 on a miss), one lock per cache, optional registry name.
+  # Subclasses keep their queues in OrderedDicts and implement _lookup/_store.
+  def __init__(self, capacity, name = None):
+    self.capacity = capacity
+    self.name = name
+    self._lock = Lock()
+    self.hits = self.misses = self.evictions = 0
+    if name is not None:
+      CacheRegistry.getInstance().register(self)
+
+  @abstractmethod
+  def _lookup(self, key):
+    pass
+
+  @abstractmethod
+  def _store(self, key, val):
+    pass
+
+  @abstractmethod
+  def _queues(self):
+    pass
+
+  def get(self, key):
+    with self._lock:
+      val = self._lookup(key)
+      if val is _MISSING:
+        self.misses += 1
+        return -1
+      self.hits += 1
+      return val
+
+  def put(self, key, val):
+    with self._lock:
+      self._store(key, val)
+
+  def __len__(self):
+    return sum(len(queue) for queue, holds_values in self._queues() if holds_values)
+
+  def stats(self):
+    with self._lock:
+      return {
+        "name": self.name,
+        "capacity": self.capacity,
+        "size": len(self),
+        "hits": self.hits,
+        "misses": self.misses,
+        "evictions": self.evictions,
+      }
+
+  def memoryFootprint(self):
+    with self._lock:
+      total = 0
+      for queue, holds_values in self._queues():
+        total += sys.getsizeof(queue)
+        for key, val in queue.items():
+          total += sys.getsizeof(key) + (sys.getsizeof(val) if holds_values else 0)
+      return total
+
+class TwoQueueCache(PolicyCache):
+  # 2Q (Johnson & Shasha): first-time keys enter a small FIFO (a1in). Only keys seen
+  # again after leaving it (remembered by key in the a1out ghost queue) reach the main
+  # LRU (am), so a one-off scan cycles through a1in without touching the hot set.
+  def __init__(self, capacity, name = None, in_ratio = 0.25, out_ratio = 0.5):
+    super().__init__(capacity, name)
+    self.in_capacity = max(1, int(capacity * in_ratio))
+    self.out_capacity = max(1, int(capacity * out_ratio))
+    self.a1in, self.a1out, self.am = OrderedDict(), OrderedDict(), OrderedDict()
+
+  def _queues(self):
+    return ((self.a1in, True), (self.a1out, False), (self.am, True))
+
+  def _lookup(self, key):
+    if key in self.am:
+      self.am.move_to_end(key)
+      return self.am[key]
+    return self.a1in.get(key, _MISSING)
+
+  def _store(self, key, val):
+    if key in self.am:
+      self.am[key] = val
+      self.am.move_to_end(key)
+    elif key in self.a1in:
+      self.a1in[key] = val
+    elif key in self.a1out:
+      del self.a1out[key]
+      self._reclaim()
+      self.am[key] = val
+    else:
+      self._reclaim()
+      self.a1in[key] = val
+
+  def _reclaim(self):
+    if len(self.a1in) + len(self.am) < self.capacity:
+      return
+    if len(self.a1in) > self.in_capacity or not self.am:
+      old, _ = self.a1in.popitem(last = False)
+      self.a1out[old] = None
+      if len(self.a1out) > self.out_capacity:
+        self.a1out.popitem(last = False)
+    else:
+      self.am.popitem(last = False)
+    self.evictions += 1
+
+class ARCCache(PolicyCache):
+  # Adaptive Replacement Cache (Megiddo & Modha): t1 holds keys seen once, t2 keys seen
+  # at least twice, b1/b2 remember keys recently evicted from each. A hit in a ghost list
+  # moves the target size p of t1 towards whichever side would have kept the key.
+  def __init__(self, capacity, name = None):
+    super().__init__(capacity, name)
+    self.p = 0
+    self.t1, self.t2, self.b1, self.b2 = OrderedDict(), OrderedDict(), OrderedDict(), OrderedDict()
+
+  def _queues(self):
+    return ((self.t1, True), (self.t2, True), (self.b1, False), (self.b2, False))
+
+  def _lookup(self, key):
+    if key in self.t1:
+      val = self.t1.pop(key)
+      self.t2[key] = val
+      return val
+    if key in self.t2:
+      self.t2.move_to_end(key)
+      return self.t2[key]
+    return _MISSING
+
+  def _replace(self, key):
+    if len(self.t1) + len(self.t2) < self.capacity:
+      return
+    if self.t1 and (len(self.t1) > self.p or (key in self.b2 and len(self.t1) == self.p)):
+      old, _ = self.t1.popitem(last = False)
+      self.b1[old] = None
+    else:
+      old, _ = self.t2.popitem(last = False)
+      self.b2[old] = None
+    self.evictions += 1
+
+  def _store(self, key, val):
+    capacity = self.capacity
+    if key in self.t1:
+      del self.t1[key]
+      self.t2[key] = val
+    elif key in self.t2:
+      self.t2[key] = val
+      self.t2.move_to_end(key)
+    elif key in self.b1:
+      self.p = min(capacity, self.p + max(len(self.b2) // len(self.b1), 1))
+      self._replace(key)
+      del self.b1[key]
+      self.t2[key] = val
+    elif key in self.b2:
+      self.p = max(0, self.p - max(len(self.b1) // len(self.b2), 1))
+      self._replace(key)
+      del self.b2[key]
+      self.t2[key] = val
+    else:
+      l1 = len(self.t1) + len(self.b1)
+      if l1 >= capacity:
+        if len(self.t1) < capacity:
+          self.b1.popitem(last = False)
+          self._replace(key)
+        else:
+          self.t1.popitem(last = False)
+          self.evictions += 1
+      else:
+        total = l1 + len(self.t2) + len(self.b2)
+        if total >= capacity:
+          if total >= 2 * capacity:
+            self.b2.popitem(last = False)
+          self._replace(key)
+      self.t1[key] = val
+
+class CountMinSketch:
+  # Approximate access frequencies in four rows of counters that saturate at 15.
+  # After sample_size increments every counter is halved, so old popularity fades.
+  _HALVE = bytes(count >> 1 for count in range(256))
+  _SEEDS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93)
+  _MASK_64 = (1 << 64) - 1
+
+  def __init__(self, width, sample_size):
+    width = max(16, 1 << (width - 1).bit_length())
+    self.shift = 64 - (width.bit_length() - 1)
+    self.rows = [bytearray(width) for _ in self._SEEDS]
+    self.sample_size = sample_size
+    self.additions = 0
+
+  def _indexes(self, key):
+    h, shift, mask = hash(key), self.shift, self._MASK_64
+    s0, s1, s2, s3 = self._SEEDS
+    return ((h * s0) & mask) >> shift, ((h * s1) & mask) >> shift, ((h * s2) & mask) >> shift, ((h * s3) & mask) >> shift
+
+  def increment(self, key):
+    i0, i1, i2, i3 = self._indexes(key)
+    r0, r1, r2, r3 = self.rows
+    if r0[i0] < 15:
+      r0[i0] += 1
+    if r1[i1] < 15:
+      r1[i1] += 1
+    if r2[i2] < 15:
+      r2[i2] += 1
+    if r3[i3] < 15:
+      r3[i3] += 1
+    self.additions += 1
+    if self.additions >= self.sample_size:
+      self._reset()
+
+  def estimate(self, key):
+    i0, i1, i2, i3 = self._indexes(key)
+    r0, r1, r2, r3 = self.rows
+    return min(r0[i0], r1[i1], r2[i2], r3[i3])
+
+  def _reset(self):
+    for row in self.rows:
+      row[:] = row.translate(self._HALVE)
+    self.additions //= 2
+
+class WTinyLFUCache(PolicyCache):
+  # W-TinyLFU (Einziger, Friedman & Manes, as in Caffeine): new keys enter a small LRU
+  # window. A key leaving the window is only admitted into the main segmented LRU if the
+  # sketch says it's accessed more often than the main LRU's victim; otherwise it is the
+  # one evicted. A scan keeps losing that contest, so the hot set stays put.
+  def __init__(self, capacity, name = None, window_ratio = 0.01, protected_ratio = 0.8):
+    super().__init__(capacity, name)
+    self.window_capacity = max(1, int(capacity * window_ratio))
+    self.main_capacity = capacity - self.window_capacity
+    self.protected_capacity = int(self.main_capacity * protected_ratio)
+    self.window, self.probation, self.protected = OrderedDict(), OrderedDict(), OrderedDict()
+    self.sketch = CountMinSketch(capacity, sample_size = 10 * capacity)
+
+  def _queues(self):
+    return ((self.window, True), (self.probation, True), (self.protected, True))
+
+  def _lookup(self, key):
+    self.sketch.increment(key)
+    if key in self.window:
+      self.window.move_to_end(key)
+      return self.window[key]
+    if key in self.protected:
+      self.protected.move_to_end(key)
+      return self.protected[key]
+    if key in self.probation:
+      val = self.probation.pop(key)
+      self._protect(key, val)
+      return val
+    return _MISSING
+
+  def _protect(self, key, val):
+    self.protected[key] = val
+    if len(self.protected) > self.protected_capacity:
+      demoted, demoted_val = self.protected.popitem(last = False)
+      self.probation[demoted] = demoted_val
+
+  def _store(self, key, val):
+    for queue in (self.window, self.protected, self.probation):
+      if key in queue:
+        queue[key] = val
+        self._lookup(key)
+        return
+    self.sketch.increment(key)
+    self.window[key] = val
+    if len(self.window) <= self.window_capacity:
+      return
+
+    candidate, candidate_val = self.window.popitem(last = False)
+    if len(self.probation) + len(self.protected) < self.main_capacity:
+      self.probation[candidate] = candidate_val
+      return
+    victims = self.probation or self.protected
+    if not victims:
+      self.evictions += 1
+      return
+    victim = next(iter(victims))
+    if self.sketch.estimate(candidate) > self.sketch.estimate(victim):
+      del victims[victim]
+      self.probation[candidate] = candidate_val
+    self.evictions += 1
+
+
+class EvictionPolicy(Enum):
+  LRU = "lru"
+  TWO_Q = "2q"
+  ARC = "arc"
+  W_TINY_LFU = "w-tinylfu"
+
+_POLICIES = {
+  EvictionPolicy.LRU: LRU,
+  EvictionPolicy.TWO_Q: TwoQueueCache,
+  EvictionPolicy.ARC: ARCCache,
+  EvictionPolicy.W_TINY_LFU: WTinyLFUCache,
+}
+
+def createCache(capacity, policy = EvictionPolicy.LRU, name = None):
+  return _POLICIES[EvictionPolicy(policy)](capacity, name = name)
+
+if __name__ == "__main__":
+  def access(cache, key):
+    if cache.get(key) == -1:
+      cache.put(key, key)
+
+  for policy in EvictionPolicy:
+    cache = createCache(10, policy)
+    for round in range(5):
+      for key in ["hot-a", "hot-b", f"cold-{round}-1", f"cold-{round}-2", f"cold-{round}-3"]:
+        access(cache, key)
+    for i in range(30):   # one-off scan
+      access(cache, f"scan-{i}")
+    print(policy.value, cache.get("hot-a"), cache.get("hot-b"), cache.stats())
@@ -0,0 +1,131 @@
+from time import perf_counter
+
+# Latency bucket upper bounds in seconds, Prometheus style (a final +Inf bucket is implied)
+LATENCY_BOUNDS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 1e-1)
+
+class LatencyHistogram:
+  def __init__(self, bounds = LATENCY_BOUNDS):
+    self.bounds = bounds
+    self.counts = [0] * (len(bounds) + 1)
+    self.sum = 0.0
+    self.count = 0
+
+  def observe(self, seconds):
+    for i, bound in enumerate(self.bounds):
+      if seconds <= bound:
+        break
+    else:
+      i = len(self.bounds)
+    self.counts[i] += 1
+    self.sum += seconds
+    self.count += 1
+
+  def snapshot(self):
+    return {"bounds": list(self.bounds), "counts": list(self.counts), "sum": self.sum, "count": self.count}
+
+class Instrumentation:
+  # Sampled timings for one cache: every sample_every-th get/put records how long it
+  # waited for the lock and how long the whole call took. Callers hold the cache lock
+  # while recording, so the histograms need no lock of their own.
+  OPERATIONS = ("get", "put")
+
+  def __init__(self, sample_rate):
+    if not 0 < sample_rate <= 1:
+      raise ValueError("sample rate must be in (0, 1]")
+    self.sample_every = max(1, round(1 / sample_rate))
+    self._countdowns = dict.fromkeys(self.OPERATIONS, self.sample_every)
+    self.latency = {op: LatencyHistogram() for op in self.OPERATIONS}
+    self.lock_wait = LatencyHistogram()
+
+  def sample(self, op):
+    # One countdown per operation so an alternating get/put pattern can't starve either.
+    # Not locked: a race only shifts which call gets sampled.
+    countdown = self._countdowns[op] - 1
+    if countdown > 0:
+      self._countdowns[op] = countdown
+      return False
+    self._countdowns[op] = self.sample_every
+    return True
+
+  def record(self, op, start, acquired):
+    self.lock_wait.observe(acquired - start)
+    self.latency[op].observe(perf_counter() - start)
+
+  def snapshot(self):
+    return {
+      "sample_every": self.sample_every,
+      "latency": {op: histogram.snapshot() for op, histogram in self.latency.items()},
+      "lock_wait": self.lock_wait.snapshot(),
+    }
+
+def mergeSnapshots(snapshots, name = None):
+  # Sums counters, gauges and histograms, e.g. over the shards of a ShardedLRU
+  merged = {"name": name, "counters": {}, "gauges": {}, "instrumentation": None}
+  for snapshot in snapshots:
+    for group in ("counters", "gauges"):
+      for metric, value in snapshot[group].items():
+        merged[group][metric] = merged[group].get(metric, 0) + value
+    timing = snapshot["instrumentation"]
+    if timing is None:
+      continue
+    if merged["instrumentation"] is None:
+      merged["instrumentation"] = {
+        "sample_every": timing["sample_every"],
+        "latency": {op: _copyHistogram(h) for op, h in timing["latency"].items()},
+        "lock_wait": _copyHistogram(timing["lock_wait"]),
+      }
+      continue
+    total = merged["instrumentation"]
+    for op, histogram in timing["latency"].items():
+      _addHistogram(total["latency"][op], histogram)
+    _addHistogram(total["lock_wait"], timing["lock_wait"])
+  return merged
+
+def _copyHistogram(histogram):
+  return dict(histogram, counts = list(histogram["counts"]))
+
+def _addHistogram(total, histogram):
+  total["counts"] = [a + b for a, b in zip(total["counts"], histogram["counts"])]
+  total["sum"] += histogram["sum"]
+  total["count"] += histogram["count"]
+
+def _escape(value):
+  return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels):
+  return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+def _histogramLines(metric, histogram, **labels):
+  lines, cumulative = [], 0
+  for bound, count in zip(histogram["bounds"] + ["+Inf"], histogram["counts"]):
+    cumulative += count
+    lines.append(f"{metric}_bucket{_labels(**labels, le = bound)} {cumulative}")
+  lines.append(f"{metric}_sum{_labels(**labels)} {histogram['sum']}")
+  lines.append(f"{metric}_count{_labels(**labels)} {histogram['count']}")
+  return lines
+
+def prometheusText(snapshots):
+  # Prometheus text exposition format for one or more cache snapshots; every metric
+  # family gets one HELP/TYPE header followed by a sample per cache
+  families = {}
+
+  def add(metric, kind, help_text, lines):
+    family = families.setdefault(metric, [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"])
+    family.extend(lines)
+
+  for snapshot in snapshots:
+    cache = snapshot["name"] if snapshot["name"] is not None else ""
+    for counter, value in snapshot["counters"].items():
+      metric = f"lru_cache_{counter}_total"
+      add(metric, "counter", f"Cache {counter.replace('_', ' ')}.", [f"{metric}{_labels(cache = cache)} {value}"])
+    for gauge, value in snapshot["gauges"].items():
+      metric = f"lru_cache_{gauge}"
+      add(metric, "gauge", f"Current cache {gauge}.", [f"{metric}{_labels(cache = cache)} {value}"])
+    timing = snapshot["instrumentation"]
+    if timing:
+      for op, histogram in timing["latency"].items():
+        add("lru_cache_op_latency_seconds", "histogram", "Sampled get/put latency.",
+            _histogramLines("lru_cache_op_latency_seconds", histogram, cache = cache, op = op))
+      add("lru_cache_lock_wait_seconds", "histogram", "Sampled time spent waiting for the cache lock.",
+          _histogramLines("lru_cache_lock_wait_seconds", timing["lock_wait"], cache = cache))
+  return "\n".join(line for family in families.values() for line in family) + "\n"
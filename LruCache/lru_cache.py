@@ -1,31 +1,168 @@
-from threading import Lock
+import asyncio
+import atexit
+import functools
+import inspect
+import math
+import sys
+import time
+from threading import Event, Lock, Thread
+from time import perf_counter
+from weakref import WeakValueDictionary
+from instrumentation import Instrumentation, mergeSnapshots, prometheusText
+from warm_start import readSnapshot, writeSnapshot
 
 class Node:
   def __init__(self, key, val):
     self.key = key
     self.val = val
     self.prev = self.next = None
+    self.expires_at = None
+    self.timer = None
+    self.weight = 1
 
-class LRU:
-  _instance = None
-  _lock = Lock()
+class TimerWheel:
+  # Hierarchical timing wheel (as in Kafka / the Linux kernel): LEVELS wheels of 64 slots,
+  # level l slots spanning 64**l ticks. A node lands in the lowest level whose span covers
+  # its delay and moves down a level each time the wheel above rolls over its slot.
+  # schedule/cancel are O(1), and advance() only touches slots that are due.
+  BITS = 6
+  SLOTS = 1 << BITS
+  LEVELS = 4
 
-  def __new__(cls, capacity):
-    with cls._lock:
-      if cls._instance is None:
-        cls._instance = super().__new__(cls)
-        cls._instance._init_once(capacity)
-      return cls._instance
+  def __init__(self, tick, now):
+    self.tick = tick
+    self.current = int(now / tick)
+    self.wheels = [[None] * self.SLOTS for _ in range(self.LEVELS)]
+    self.overflow = set()
+    self.counts = [0] * (self.LEVELS + 1)
 
-  def _init_once(self, capacity):
-    if hasattr(self, "_initialized"):
-      return
+  def __len__(self):
+    return sum(self.counts)
+
+  def schedule(self, node):
+    expire_tick = max(math.ceil(node.expires_at / self.tick), self.current + 1)
+    delay = expire_tick - self.current
+    for level in range(self.LEVELS):
+      if delay < 1 << (self.BITS * (level + 1)):
+        slot_index = (expire_tick >> (self.BITS * level)) & (self.SLOTS - 1)
+        slot = self.wheels[level][slot_index]
+        if slot is None:
+          slot = self.wheels[level][slot_index] = set()
+        break
+    else:
+      level, slot = self.LEVELS, self.overflow
+    slot.add(node)
+    node.timer = (slot, level)
+    self.counts[level] += 1
+
+  def cancel(self, node):
+    if node.timer:
+      slot, level = node.timer
+      slot.discard(node)
+      self.counts[level] -= 1
+      node.timer = None
+
+  def _takeSlot(self, level, slot_index):
+    slot = self.wheels[level][slot_index]
+    self.wheels[level][slot_index] = None
+    return slot or ()
+
+  def advance(self, now):
+    # Returns the nodes whose expiry tick has passed
+    target, expired = int(now / self.tick), []
+    while self.current < target:
+      if not len(self):
+        self.current = target
+        break
+      # Jump straight to the next rollover of the lowest non-empty level: nothing can
+      # fire or cascade in between
+      lowest = next(level for level, count in enumerate(self.counts) if count)
+      step = 1 << (self.BITS * lowest)
+      self.current = min(target, (self.current // step + 1) * step)
+      if self.current % step:
+        break
+
+      if self.current % (1 << (self.BITS * self.LEVELS)) == 0:
+        nodes, self.overflow = self.overflow, set()
+        self.counts[self.LEVELS] = 0
+        self._reschedule(nodes, expired)
+      for level in range(self.LEVELS - 1, 0, -1):
+        if self.current % (1 << (self.BITS * level)) == 0:
+          slot_index = (self.current >> (self.BITS * level)) & (self.SLOTS - 1)
+          nodes = self._takeSlot(level, slot_index)
+          self.counts[level] -= len(nodes)
+          self._reschedule(nodes, expired)
+      for node in self._takeSlot(0, self.current & (self.SLOTS - 1)):
+        self.counts[0] -= 1
+        node.timer = None
+        expired.append(node)
+    return expired
+
+  def _reschedule(self, nodes, expired):
+    for node in nodes:
+      node.timer = None
+      if math.ceil(node.expires_at / self.tick) <= self.current:
+        expired.append(node)
+      else:
+        self.schedule(node)
+
+class _Flight:
+  # One in-flight load shared by every thread that misses the same key
+  def __init__(self):
+    self.done = Event()
+    self.val = self.error = None
+
+  def resolve(self, val):
+    self.val = val
+    self.done.set()
+
+  def fail(self, error):
+    self.error = error
+    self.done.set()
+
+  def wait(self):
+    self.done.wait()
+    if self.error is not None:
+      raise self.error
+    return self.val
+
+class LRU:
+  def __init__(self, capacity, name = None, default_ttl = None, ttl_tick = 1.0, clock = time.monotonic,
+               weigher = None, refresh_ahead = None):
+    # capacity is a budget on the summed entry weights. Every entry weighs 1 unless put()
+    # gets an explicit weight or the cache has a weigher(key, val), e.g. a size in bytes.
     self.capacity = capacity
+    self.weigher = weigher
+    self.weight = 0
+    self.name = name
     self.cache = {}
     self.mru, self.lru = Node(-1, -1), Node(-1, -1)
     self.lru.next = self.mru
     self.mru.prev = self.lru
-    self._initialized = True
+    self._lock = Lock()
+    self.hits = self.misses = self.evictions = self.expirations = self.rejections = 0
+    self.inserts = self.updates = 0
+    self._instruments = None
+    # TTLs: expiry deadlines live in a timer wheel, created on the first TTL put. Due
+    # entries are reclaimed opportunistically on get/put or by the optional sweeper thread.
+    self.default_ttl = default_ttl
+    self.ttl_tick = ttl_tick
+    self.clock = clock
+    self.wheel = None
+    self._sweeper = None
+    self._snapshotter = None
+    # Loading: in-flight loads per key (threads) and per (event loop, key) (asyncio).
+    # With refresh_ahead, a get_or_load hit within that many seconds of the entry's
+    # expiry reloads it in the background while the old value keeps being served.
+    self.refresh_ahead = refresh_ahead
+    self._inflight = {}
+    self._async_inflight = {}
+    self._load_tasks = set()
+    self.loads = self.load_failures = 0
+    # Set by ShardedLRU: shared shard for entries heavier than this one's whole budget
+    self.overflow = None
+    if name is not None:
+      CacheRegistry.getInstance().register(self)
 
   def insert(self, node):
     prv = self.mru.prev
@@ -33,32 +170,615 @@ class LRU:
     self.mru.prev = node
     node.prev = prv
     node.next = self.mru
-  
+
   def remove(self, node: Node):
     prv, nxt = node.prev, node.next
     prv.next = nxt
     nxt.prev = prv
-  
-  def put(self, key, val):
-    with self._lock:
-      if key in self.cache:
-        self.remove(self.cache[key])
-      self.cache[key] = Node(key, val)
-      self.insert(self.cache[key])
-
-      if self.capacity < len(self.cache):
-        lru = self.lru.next
-        self.remove(lru)
-        del self.cache[lru.key]
-  
+
+  def put(self, key, val, ttl = None, weight = None):
+    # Returns False if the entry alone is heavier than the whole budget; it is not
+    # cached and any older value for the key is dropped
+    weight = self._weigh(key, val, weight)
+    if self.overflow is not None:
+      spilled = self._spill(key, val, ttl, weight)
+      if spilled is not None:
+        return spilled
+    with self._lock:
+      return self._put(key, val, ttl, weight)
+
+  def _spill(self, key, val, ttl, weight):
+    # An entry too heavy for this shard goes to the overflow shard instead, and a key
+    # stored here is dropped from there. Returns the overflow put's result, or None
+    # when the entry stays in this shard.
+    overflow = self.overflow
+    if weight > self.capacity:
+      self.invalidate(key)
+      return overflow.put(key, val, ttl, weight)
+    if key in overflow.cache:
+      overflow.invalidate(key)
+    return None
+
+  def invalidate(self, key):
+    # Drops key; returns whether it was cached
+    with self._lock:
+      node = self.cache.get(key)
+      if node is None:
+        return False
+      self._discard(node)
+      return True
+
+  def _weigh(self, key, val, weight):
+    if weight is None:
+      weight = self.weigher(key, val) if self.weigher else 1
+    if weight < 0:
+      raise ValueError("entry weight can't be negative")
+    return weight
+
+  def _put(self, key, val, ttl, weight):
+    # Caller holds the lock
+    self._expire()
+    if key in self.cache:
+      self._discard(self.cache[key])
+      self.updates += 1
+    else:
+      self.inserts += 1
+    if weight > self.capacity:
+      self.rejections += 1
+      return False
+    node = self.cache[key] = Node(key, val)
+    node.weight = weight
+    self.weight += weight
+    self.insert(node)
+
+    ttl = ttl if ttl is not None else self.default_ttl
+    if ttl is not None:
+      if self.wheel is None:
+        self.wheel = TimerWheel(self.ttl_tick, self.clock())
+      node.expires_at = self.clock() + ttl
+      self.wheel.schedule(node)
+
+    self._evictOverflow()
+    return True
+
+  def _discard(self, node):
+    self.remove(node)
+    del self.cache[node.key]
+    self.weight -= node.weight
+    if node.timer:
+      self.wheel.cancel(node)
+
+  def _evictOverflow(self):
+    while self.capacity < self.weight:
+      self._discard(self.lru.next)
+      self.evictions += 1
+
+  def _expire(self):
+    if not self.wheel or not len(self.wheel):
+      return
+    for node in self.wheel.advance(self.clock()):
+      if self.cache.get(node.key) is node:
+        self._discard(node)
+        self.expirations += 1
+
+  def sweep(self):
+    with self._lock:
+      self._expire()
+
+  def startSweeper(self, interval = 1.0):
+    # Background reclaim for caches that may sit idle while holding expired entries
+    if self._sweeper:
+      return
+    stop = Event()
+
+    def run():
+      while not stop.wait(interval):
+        self.sweep()
+
+    self._sweeper = (Thread(target = run, daemon = True), stop)
+    self._sweeper[0].start()
+
+  def stopSweeper(self):
+    if self._sweeper:
+      thread, stop = self._sweeper
+      stop.set()
+      thread.join()
+      self._sweeper = None
+
+  # Warm start
+  def dump(self, path):
+    # Copies the entries out under the lock (MRU first) and writes them after releasing
+    # it, so serving only pauses for the list walk, not the disk I/O
+    with self._lock:
+      self._expire()
+      now = self.clock()
+      offset = time.time() - now
+      entries = []
+      node = self.mru.prev
+      while node is not self.lru:
+        if node.expires_at is None:
+          entries.append((node.key, node.val, None, node.weight))
+        elif node.expires_at > now:
+          entries.append((node.key, node.val, node.expires_at + offset, node.weight))
+        node = node.prev
+    return writeSnapshot(path, entries)
+
+  def load(self, path, limit = None, batch_size = 1000):
+    # Streams a dump() back in. Records arrive hottest first and are appended at the LRU
+    # end, so the old recency order is rebuilt behind anything written since startup;
+    # keys already cached are left alone. Expired entries are skipped and loading stops
+    # after limit entries or once the budget is full. The lock is taken per batch, so
+    # gets and puts keep being served while a large snapshot loads.
+    if limit is not None and limit <= 0:
+      return 0
+    loaded, batch = 0, []
+    for record in readSnapshot(path):
+      batch.append(record)
+      if len(batch) == batch_size:
+        restored, done = self._restoreBatch(batch, None if limit is None else limit - loaded)
+        loaded += restored
+        batch = []
+        if done:
+          return loaded
+    if batch:
+      loaded += self._restoreBatch(batch, None if limit is None else limit - loaded)[0]
+    return loaded
+
+  def _restoreBatch(self, batch, room):
+    # Restores up to room entries (None: no limit); keys already cached don't count.
+    # Returns (restored, done), done once room is used up or the budget is full.
+    restored = 0
+    with self._lock:
+      cache, capacity, sentinel = self.cache, self.capacity, self.lru
+      now = self.clock()
+      for key, val, ttl, weight in batch:
+        if key in cache or weight > capacity:
+          continue
+        if self.weight + weight > capacity:
+          return restored, True
+        node = cache[key] = Node(key, val)
+        node.weight = weight
+        self.weight += weight
+        # Link at the LRU end, behind everything already cached (insert() mirrored)
+        nxt = sentinel.next
+        nxt.prev = node
+        sentinel.next = node
+        node.prev = sentinel
+        node.next = nxt
+        if ttl is not None:
+          if self.wheel is None:
+            self.wheel = TimerWheel(self.ttl_tick, now)
+          node.expires_at = now + ttl
+          self.wheel.schedule(node)
+        restored += 1
+        if restored == room:
+          return restored, True
+    return restored, False
+
+  def startSnapshotter(self, path, interval = 60.0, on_exit = True):
+    # Dumps to path every interval seconds (None: never periodically) and, with
+    # on_exit, once more when the interpreter shuts down
+    if self._snapshotter:
+      return
+    stop = Event()
+
+    def run():
+      while not stop.wait(interval):
+        self.dump(path)
+
+    thread = Thread(target = run, daemon = True) if interval else None
+    exit_hook = functools.partial(self.dump, path) if on_exit else None
+    self._snapshotter = (thread, stop, exit_hook)
+    if thread:
+      thread.start()
+    if exit_hook:
+      atexit.register(exit_hook)
+
+  def stopSnapshotter(self, dump = True):
+    if self._snapshotter:
+      thread, stop, exit_hook = self._snapshotter
+      stop.set()
+      if thread:
+        thread.join()
+      if exit_hook:
+        atexit.unregister(exit_hook)
+        if dump:
+          exit_hook()
+      self._snapshotter = None
+
+  def resize(self, capacity):
+    # Rebalance memory between caches at runtime; shrinking evicts from the LRU end
+    with self._lock:
+      self.capacity = capacity
+      self._evictOverflow()
+
+  def get(self, key):
+    with self._lock:
+      node = self._lookup(key)
+      return node.val if node else -1
+
+  def _lookup(self, key):
+    # Caller holds the lock. Counts the hit or miss and moves a hit to the MRU end.
+    self._expire()
+    node = self.cache.get(key)
+    # The wheel works in ticks, so an entry can be past its deadline before its slot fires
+    if node and node.expires_at is not None and node.expires_at <= self.clock():
+      self._discard(node)
+      self.expirations += 1
+      node = None
+    if node:
+      self.hits += 1
+      self.remove(node)
+      self.insert(node)
+      return node
+    self.misses += 1
+    return None
+
+  # Instrumentation
+  def enableInstrumentation(self, sample_rate = 0.01):
+    # Swaps in sampling get/put on this instance only. While disabled the class methods
+    # run untouched, so there is no per call cost at all.
+    self._instruments = Instrumentation(sample_rate)
+    self.get = self._sampledGet
+    self.put = self._sampledPut
+
+  def disableInstrumentation(self):
+    # Keeps the collected histograms around for snapshot()
+    self.__dict__.pop("get", None)
+    self.__dict__.pop("put", None)
+
+  def isInstrumented(self):
+    return "get" in self.__dict__
+
+  def _sampledGet(self, key):
+    instruments = self._instruments
+    if not instruments.sample("get"):
+      return LRU.get(self, key)
+    start = perf_counter()
+    with self._lock:
+      acquired = perf_counter()
+      node = self._lookup(key)
+      instruments.record("get", start, acquired)
+    return node.val if node else -1
+
+  def _sampledPut(self, key, val, ttl = None, weight = None):
+    instruments = self._instruments
+    if not instruments.sample("put"):
+      return LRU.put(self, key, val, ttl, weight)
+    start = perf_counter()
+    weight = self._weigh(key, val, weight)
+    if self.overflow is not None:
+      spilled = self._spill(key, val, ttl, weight)
+      if spilled is not None:
+        return spilled
+    with self._lock:
+      acquired = perf_counter()
+      stored = self._put(key, val, ttl, weight)
+      instruments.record("put", start, acquired)
+    return stored
+
+  def snapshot(self):
+    with self._lock:
+      writes = self.inserts + self.updates
+      return {
+        "name": self.name,
+        "counters": {
+          "hits": self.hits,
+          "misses": self.misses,
+          "evictions": self.evictions,
+          "expirations": self.expirations,
+          "rejections": self.rejections,
+          "inserts": self.inserts,
+          "updates": self.updates,
+          "loads": self.loads,
+          "load_failures": self.load_failures,
+        },
+        "gauges": {
+          "size": len(self.cache),
+          "weight": self.weight,
+          "capacity": self.capacity,
+          "insert_ratio": self.inserts / writes if writes else 0.0,
+        },
+        "instrumentation": self._instruments.snapshot() if self._instruments else None,
+      }
+
+  def prometheus(self):
+    return prometheusText([self.snapshot()])
+
+  def _dueForRefresh(self, node):
+    return (self.refresh_ahead is not None and node.expires_at is not None
+            and node.expires_at - self.clock() <= self.refresh_ahead)
+
+  # Loading cache
+  def get_or_load(self, key, loader, ttl = None, weight = None):
+    # On a miss only the first thread calls loader(key); the others wait for its result
+    with self._lock:
+      node = self._lookup(key)
+      flight = self._inflight.get(key)
+      if node:
+        if flight is None and self._dueForRefresh(node):
+          self._inflight[key] = _Flight()
+          Thread(target = self._load, args = (key, loader, ttl, weight, True), daemon = True).start()
+        return node.val
+      leader = flight is None
+      if leader:
+        flight = self._inflight[key] = _Flight()
+    if not leader:
+      return flight.wait()
+    return self._load(key, loader, ttl, weight)
+
+  def _load(self, key, loader, ttl, weight, refresh = False):
+    flight = self._inflight[key]
+    try:
+      val = loader(key)
+    except BaseException as error:
+      with self._lock:
+        self.load_failures += 1
+        del self._inflight[key]
+      flight.fail(error)
+      if refresh:
+        return None   # a failed background refresh keeps serving the old value
+      raise
+    self.put(key, val, ttl, weight)
+    with self._lock:
+      self.loads += 1
+      del self._inflight[key]
+    flight.resolve(val)
+    return val
+
+  async def get_or_load_async(self, key, loader, ttl = None, weight = None):
+    # Same as get_or_load for coroutine loaders: concurrent tasks on one event loop
+    # share a single await loader(key). The load runs in its own task and every caller
+    # awaits it through a shield, so cancelling one caller (even the first) doesn't
+    # cancel the load the others are waiting for.
+    loop = asyncio.get_running_loop()
+    flight_key = (loop, key)
+    with self._lock:
+      node = self._lookup(key)
+      task = self._async_inflight.get(flight_key)
+      if node:
+        if task is None and self._dueForRefresh(node):
+          # Nobody awaits a refresh started from a hit, so a failure only reaches the
+          # misses that join it (_loadDone marks it retrieved)
+          self._startLoadAsync(loop, flight_key, loader, ttl, weight)
+        return node.val
+      if task is None:
+        task = self._startLoadAsync(loop, flight_key, loader, ttl, weight)
+    return await asyncio.shield(task)
+
+  def _startLoadAsync(self, loop, flight_key, loader, ttl, weight):
+    # Caller holds the lock. The task set keeps a strong reference until the load is done.
+    task = self._async_inflight[flight_key] = loop.create_task(self._loadAsync(flight_key, loader, ttl, weight))
+    self._load_tasks.add(task)
+    task.add_done_callback(self._loadDone)
+    return task
+
+  def _loadDone(self, task):
+    self._load_tasks.discard(task)
+    # Callers that were all cancelled leave nobody to see a failure; mark it retrieved
+    if not task.cancelled():
+      task.exception()
+
+  async def _loadAsync(self, flight_key, loader, ttl, weight):
+    key = flight_key[1]
+    try:
+      val = await loader(key)
+    except BaseException:
+      with self._lock:
+        self.load_failures += 1
+        del self._async_inflight[flight_key]
+      raise
+    self.put(key, val, ttl, weight)
+    with self._lock:
+      self.loads += 1
+      del self._async_inflight[flight_key]
+    return val
+
+  def stats(self):
+    with self._lock:
+      return {
+        "name": self.name,
+        "capacity": self.capacity,
+        "size": len(self.cache),
+        "weight": self.weight,
+        "hits": self.hits,
+        "misses": self.misses,
+        "evictions": self.evictions,
+        "expirations": self.expirations,
+        "rejections": self.rejections,
+        "inserts": self.inserts,
+        "updates": self.updates,
+        "loads": self.loads,
+        "load_failures": self.load_failures,
+      }
+
+  def memoryFootprint(self):
+    # Shallow estimate in bytes: the key -> node dict, the nodes and their keys and values
+    with self._lock:
+      total = sys.getsizeof(self.cache)
+      for node in self.cache.values():
+        total += sys.getsizeof(node) + sys.getsizeof(node.__dict__)
+        total += sys.getsizeof(node.key) + sys.getsizeof(node.val)
+      return total
+
+class ShardedLRU:
+  # Keys are hashed into independent LRU shards, each with its own lock, list and a
+  # share of the capacity. Threads only contend when they touch the same shard.
+  # Recency is per shard, so eviction is approximately (not strictly) LRU overall.
+  # Each shard only gets its share of a weight budget, so an entry heavier than that is
+  # rejected, unless overflow sets aside that much of capacity for a shared shard that
+  # takes such entries.
+  def __init__(self, capacity, shards = 16, name = None, default_ttl = None, weigher = None, refresh_ahead = None,
+               overflow = None):
+    if overflow is not None and not 0 < overflow < capacity:
+      raise ValueError("overflow must be part of the capacity")
+    self.capacity = capacity
+    self.name = name
+    shared = capacity - (overflow or 0)
+    shards = max(1, min(shards, shared))
+    self.shards = [
+      LRU(shared // shards + (1 if i < shared % shards else 0), default_ttl = default_ttl, weigher = weigher,
+          refresh_ahead = refresh_ahead)
+      for i in range(shards)
+    ]
+    self.overflow = None
+    if overflow is not None:
+      self.overflow = LRU(overflow, default_ttl = default_ttl, weigher = weigher, refresh_ahead = refresh_ahead)
+      for shard in self.shards:
+        shard.overflow = self.overflow
+    if name is not None:
+      CacheRegistry.getInstance().register(self)
+
+  def _shard(self, key):
+    # A key that spilled over lives in the overflow shard until it's put again light
+    # enough for its own shard (unlocked peek: a dict lookup is atomic)
+    overflow = self.overflow
+    if overflow is not None and key in overflow.cache:
+      return overflow
+    return self.shards[hash(key) % len(self.shards)]
+
+  def _allShards(self):
+    return self.shards + [self.overflow] if self.overflow is not None else self.shards
+
+  def put(self, key, val, ttl = None, weight = None):
+    return self.shards[hash(key) % len(self.shards)].put(key, val, ttl, weight)
+
   def get(self, key):
+    return self._shard(key).get(key)
+
+  def get_or_load(self, key, loader, ttl = None, weight = None):
+    return self._shard(key).get_or_load(key, loader, ttl, weight)
+
+  async def get_or_load_async(self, key, loader, ttl = None, weight = None):
+    return await self._shard(key).get_or_load_async(key, loader, ttl, weight)
+
+  def stats(self):
+    shard_stats = [shard.stats() for shard in self._allShards()]
+    total = {name: sum(stats[name] for stats in shard_stats) for name in shard_stats[0] if name != "name"}
+    total["name"] = self.name
+    total["capacity"] = self.capacity
+    total["shards"] = len(self.shards)
+    total["shard_sizes"] = [stats["size"] for stats in shard_stats[:len(self.shards)]]
+    if self.overflow is not None:
+      total["overflow_size"] = shard_stats[-1]["size"]
+    return total
+
+  def memoryFootprint(self):
+    return sum(shard.memoryFootprint() for shard in self._allShards())
+
+  def enableInstrumentation(self, sample_rate = 0.01):
+    for shard in self._allShards():
+      shard.enableInstrumentation(sample_rate)
+
+  def disableInstrumentation(self):
+    for shard in self._allShards():
+      shard.disableInstrumentation()
+
+  def snapshot(self):
+    merged = mergeSnapshots([shard.snapshot() for shard in self._allShards()], self.name)
+    writes = merged["counters"]["inserts"] + merged["counters"]["updates"]
+    merged["gauges"]["insert_ratio"] = merged["counters"]["inserts"] / writes if writes else 0.0
+    return merged
+
+  def prometheus(self):
+    return prometheusText([self.snapshot()])
+
+def _freeze(value):
+  # Unhashable arguments (lists, dicts, sets) become equivalent hashable tuples
+  if isinstance(value, dict):
+    return ("__dict__",) + tuple(sorted(((k, _freeze(v)) for k, v in value.items()), key = repr))
+  if isinstance(value, (list, tuple)):
+    return (type(value).__name__,) + tuple(_freeze(v) for v in value)
+  if isinstance(value, (set, frozenset)):
+    return ("__set__",) + tuple(sorted((_freeze(v) for v in value), key = repr))
+  return value
+
+def _memoKey(fn, signature, args, kwargs, typed):
+  # Bind to the signature and fill in defaults, so f(1), f(1, b=2) and f(a=1, b=2)
+  # all share one cache entry
+  bound = signature.bind(*args, **kwargs)
+  bound.apply_defaults()
+  key = [fn.__module__, fn.__qualname__]
+  for name, value in bound.arguments.items():
+    key.append((name, _freeze(value)))
+    if typed:
+      key.append(type(value))
+  return tuple(key)
+
+def lru_memoize(cache = None, capacity = 128, ttl = None, typed = False):
+  # Memoizes fn through an LRU/ShardedLRU loading cache, so concurrent calls with the same
+  # arguments run fn once. Works on both plain functions and coroutine functions.
+  def decorator(fn):
+    target = cache if cache is not None else LRU(capacity)
+    signature = inspect.signature(fn)
+
+    if inspect.iscoroutinefunction(fn):
+      @functools.wraps(fn)
+      async def async_wrapper(*args, **kwargs):
+        key = _memoKey(fn, signature, args, kwargs, typed)
+        return await target.get_or_load_async(key, lambda _: fn(*args, **kwargs), ttl)
+      async_wrapper.cache = target
+      return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+      key = _memoKey(fn, signature, args, kwargs, typed)
+      return target.get_or_load(key, lambda _: fn(*args, **kwargs), ttl)
+    wrapper.cache = target
+    return wrapper
+  return decorator
+
+class CacheRegistry:
+  # Process-wide directory of named caches. Holds weak references, so a cache that
+  # is no longer used elsewhere drops out of the report on its own.
+  _instance = None
+  _lock = Lock()
+
+  def __init__(self):
+    self._caches = WeakValueDictionary()
+
+  @classmethod
+  def getInstance(cls):
+    with cls._lock:
+      if cls._instance is None:
+        cls._instance = cls()
+    return cls._instance
+
+  def register(self, cache):
     with self._lock:
-      if key in self.cache:
-        self.remove(self.cache[key])
-        self.insert(self.cache[key])
-        return self.cache[key].val
-      return -1
-  
+      if cache.name in self._caches:
+        raise ValueError(f"a cache named {cache.name!r} is already registered")
+      self._caches[cache.name] = cache
+
+  def get(self, name):
+    return self._caches.get(name)
+
+  def report(self):
+    rows = []
+    for name, cache in sorted(self._caches.items()):
+      stats = cache.stats()
+      lookups = stats["hits"] + stats["misses"]
+      stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+      stats["memory_bytes"] = cache.memoryFootprint()
+      rows.append(stats)
+    return rows
+
+  def _instrumentable(self, name = None):
+    caches = sorted(self._caches.items()) if name is None else [(name, self._caches[name])]
+    return [cache for _, cache in caches if hasattr(cache, "snapshot")]
+
+  def enableInstrumentation(self, name = None, sample_rate = 0.01):
+    # Turn on sampling for one named cache (or all of them) in a running process
+    for cache in self._instrumentable(name):
+      cache.enableInstrumentation(sample_rate)
+
+  def disableInstrumentation(self, name = None):
+    for cache in self._instrumentable(name):
+      cache.disableInstrumentation()
+
+  def prometheus(self):
+    return prometheusText([cache.snapshot() for cache in self._instrumentable()])
+
 if __name__ == "__main__":
   lru = LRU(2)
   lru.put(1, 'A')
@@ -67,3 +787,86 @@ if __name__ == "__main__":
   lru.put(3, 'C')    # Evict key 2
   print(lru.get(2))  # -1
   print(lru.get(3))  # C
+
+  sharded = ShardedLRU(8, shards = 4)
+  for i in range(12):
+    sharded.put(i, i * i)
+  print(sharded.get(11), sharded.get(0))
+  print(sharded.stats())
+
+  sessions = LRU(100, name = "sessions")
+  users = ShardedLRU(1000, shards = 4, name = "users")
+  for i in range(300):
+    sessions.put(i, f"session-{i}")
+    users.put(i % 50, {"id": i})
+    sessions.get(i // 2)
+    users.get(i % 60)
+  sessions.resize(50)
+  for row in CacheRegistry.getInstance().report():
+    print(row["name"], row["capacity"], row["size"], f"{row['hit_ratio']:.2f}", row["evictions"], row["memory_bytes"])
+
+  now = [0.0]
+  upstream = LRU(3, default_ttl = 60, clock = lambda: now[0])
+  upstream.put("price", 10)
+  upstream.put("quote", 20, ttl = 5)
+  upstream.put("static", 30, ttl = 3600)
+  now[0] = 10
+  print(upstream.get("quote"), upstream.get("price"))  # -1 10
+  now[0] = 120
+  upstream.sweep()
+  print(upstream.get("static"), upstream.stats())
+
+  blobs = LRU(1000, weigher = lambda key, val: len(val))
+  blobs.put("a", b"x" * 400)
+  blobs.put("b", b"x" * 400)
+  blobs.put("c", b"x" * 300)     # over budget: evicts "a"
+  print(blobs.put("huge", b"x" * 5000), blobs.get("a"), blobs.stats()["weight"])  # False -1 700
+
+  calls = []
+
+  @lru_memoize(capacity = 10)
+  def slowSquare(x, scale = 1):
+    calls.append(x)
+    time.sleep(0.05)
+    return x * x * scale
+
+  workers = [Thread(target = slowSquare, args = (4,)) for _ in range(10)]
+  for worker in workers:
+    worker.start()
+  for worker in workers:
+    worker.join()
+  print(slowSquare(4), slowSquare(x = 4, scale = 1), calls)  # 16 16 [4]
+
+  async def fetchQuote(symbol):
+    await asyncio.sleep(0.05)
+    return f"{symbol}: 42"
+
+  async def fetchAll():
+    quotes = LRU(10)
+    return await asyncio.gather(*(quotes.get_or_load_async("ACME", fetchQuote) for _ in range(5))), quotes.stats()["loads"]
+  print(asyncio.run(fetchAll()))
+
+  registry = CacheRegistry.getInstance()
+  registry.enableInstrumentation("sessions", sample_rate = 0.5)
+  for i in range(100):
+    sessions.put(i % 70, i)
+    sessions.get(i % 80)
+  registry.disableInstrumentation("sessions")
+  print(sessions.snapshot()["instrumentation"]["latency"]["get"]["count"])  # 50, every other get
+  print("\n".join(line for line in registry.prometheus().splitlines() if "hits" in line or "_count" in line))
+
+  import os
+  import tempfile
+  snapshot_path = os.path.join(tempfile.mkdtemp(), "sessions.lru")
+  before = LRU(6, default_ttl = 3600)
+  for key in "abcde":
+    before.put(key, key.upper())
+  before.put("short", "gone", ttl = 0.01)
+  before.get("a")
+  time.sleep(0.02)
+  print(before.dump(snapshot_path))    # 5, "short" already expired
+  after = LRU(4)
+  after.put("z", "fresh")              # written after startup, stays most recent
+  print(after.load(snapshot_path, limit = 3), list(after.cache))  # 3 ['z', 'a', 'e', 'd']
+  after.put("y", "Y")                  # evicts "d", the coldest restored entry
+  print(after.get("d"), after.get("a"))  # -1 A
@@ -0,0 +1,58 @@
+import os
+import pickle
+import struct
+import time
+
+# Warm start snapshot layout (little endian):
+#   header | records, most recently used first
+# Each record is a fixed header followed by the pickled (key, value) pair. Deadlines are
+# stored as wall clock times, since the cache's own clock (monotonic by default) doesn't
+# survive a restart.
+_MAGIC = b"LRUW"
+_VERSION = 2
+_HEADER = struct.Struct("<4sHHQ")  # magic, version, reserved, entry count
+_RECORD = struct.Struct("<ddI")    # wall clock expiry (0 = no TTL), weight, payload length
+# Version 1 stored weights as unsigned ints, which can't hold a weigher's float weights
+_RECORDS = {1: struct.Struct("<dQI"), _VERSION: _RECORD}
+
+def writeSnapshot(path, entries):
+  # entries yields (key, val, expires_at_wall or None, weight) in MRU -> LRU order.
+  # Written to a temp file and renamed into place, so a crash mid-dump leaves the
+  # previous snapshot intact.
+  tmp_path = f"{path}.tmp"
+  count = 0
+  with open(tmp_path, "wb") as f:
+    f.write(_HEADER.pack(_MAGIC, _VERSION, 0, 0))
+    for key, val, expires_at, weight in entries:
+      payload = pickle.dumps((key, val), pickle.HIGHEST_PROTOCOL)
+      f.write(_RECORD.pack(expires_at or 0.0, weight, len(payload)))
+      f.write(payload)
+      count += 1
+    f.seek(0)
+    f.write(_HEADER.pack(_MAGIC, _VERSION, 0, count))
+    f.flush()
+    os.fsync(f.fileno())
+  os.replace(tmp_path, path)
+  return count
+
+def readSnapshot(path, now = None):
+  # Streams (key, val, remaining_ttl or None, weight) in MRU -> LRU order, one record
+  # at a time, dropping entries whose deadline has passed
+  now = time.time() if now is None else now
+  with open(path, "rb") as f:
+    magic, version, _, count = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != _MAGIC or version not in _RECORDS:
+      raise ValueError(f"{path} is not an LRU snapshot")
+    record = _RECORDS[version]
+    read, record_size = f.read, record.size
+    for _ in range(count):
+      expires_at, weight, length = record.unpack(read(record_size))
+      payload = read(length)
+      if len(payload) != length:
+        raise ValueError(f"{path} is truncated")
+      if expires_at and expires_at <= now:
+        continue
+      key, val = pickle.loads(payload)
+      if isinstance(weight, float) and weight.is_integer():
+        weight = int(weight)
+      yield key, val, expires_at - now if expires_at else None, weight